@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import UserProfile, Employee, Attendance
+from .models import UserProfile, Employee, Attendance, MonthlyAttendanceSummary, ArchivedAttendance, ApiToken, Job, PayrollRun
 
 
 @admin.register(UserProfile)
@@ -22,3 +22,45 @@ class AttendanceAdmin(admin.ModelAdmin):
     list_filter = ['status', 'date', 'employee']
     search_fields = ['employee__name', 'employee__emp_id']
     ordering = ['-date', 'employee']
+
+
+@admin.register(MonthlyAttendanceSummary)
+class MonthlyAttendanceSummaryAdmin(admin.ModelAdmin):
+    list_display = ['employee', 'year', 'month', 'present', 'absent', 'leave', 'holiday', 'updated_at']
+    list_filter = ['year', 'month']
+    search_fields = ['employee__name', 'employee__emp_id']
+    ordering = ['-year', '-month', 'employee']
+    readonly_fields = ['owner', 'employee', 'year', 'month', 'present', 'absent', 'leave', 'holiday', 'updated_at']
+
+
+@admin.register(ArchivedAttendance)
+class ArchivedAttendanceAdmin(admin.ModelAdmin):
+    list_display = ['employee', 'year', 'month', 'archived_at']
+    list_filter = ['year', 'month']
+    search_fields = ['employee__name', 'employee__emp_id']
+    ordering = ['-year', '-month', 'employee']
+    readonly_fields = ['owner', 'employee', 'year', 'month', 'marked', 'statuses', 'archived_at']
+
+
+@admin.register(ApiToken)
+class ApiTokenAdmin(admin.ModelAdmin):
+    list_display = ['name', 'owner', 'key', 'is_active', 'created_at', 'last_used_at']
+    list_filter = ['is_active']
+    search_fields = ['name', 'owner__username']
+    readonly_fields = ['key', 'created_at', 'last_used_at']
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ['kind', 'owner', 'status', 'message', 'created_at', 'finished_at']
+    list_filter = ['kind', 'status']
+    search_fields = ['owner__username']
+    readonly_fields = ['created_at', 'started_at', 'finished_at']
+
+
+@admin.register(PayrollRun)
+class PayrollRunAdmin(admin.ModelAdmin):
+    list_display = ['owner', 'year', 'month', 'employee_count', 'total_pay', 'created_at']
+    list_filter = ['year', 'month']
+    search_fields = ['owner__username']
+    readonly_fields = ['created_at']
@@ -0,0 +1,234 @@
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.db.models import Case, CharField, Value, When
+from django.db.models.functions import Cast
+
+from .archive import archived_months
+from .models import Attendance, Employee, PackedMonthlyAttendance
+from .packing import STATUS_CODES
+from .summaries import months_filter
+
+
+UNMARKED = -1
+PRESENT, ABSENT, HOLIDAY = STATUS_CODES['Present'], STATUS_CODES['Absent'], STATUS_CODES['Holiday']
+WEEKDAYS = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
+MAX_DAYS = 731
+# An employee shows a Monday effect when their Monday absence rate is at least this
+# multiple of their Tuesday-Friday rate, over at least MIN_MONDAYS worked Mondays
+MONDAY_FACTOR = 1.5
+MIN_MONDAYS = 4
+
+
+class StatusMatrix:
+    """Dense employees x days array of status codes for one owner, UNMARKED where no status was recorded"""
+
+    def __init__(self, employees, start, end):
+        self.employees = employees
+        self.start = start
+        self.end = end
+        self.ids = np.fromiter((employee[0] for employee in employees), dtype=np.int64, count=len(employees))
+        self.codes = np.full((len(employees), (end - start).days + 1), UNMARKED, dtype=np.int8)
+
+    @property
+    def dates(self):
+        return np.arange(np.datetime64(self.start, 'D'), np.datetime64(self.end, 'D') + 1)
+
+    def _rows_for(self, employee_ids):
+        employee_ids = np.asarray(employee_ids, dtype=np.int64)
+        rows = np.searchsorted(self.ids, employee_ids).clip(0, max(len(self.ids) - 1, 0))
+        known = self.ids[rows] == employee_ids if len(self.ids) else np.zeros(len(employee_ids), dtype=bool)
+        return rows, known
+
+    def fill_from_rows(self, records):
+        """Fill from (employee_id, 'YYYY-MM-DD', status code) tuples"""
+        if not records:
+            return
+        # A structured array converts the whole list in C instead of per value
+        records = np.array(records, dtype=[('employee', np.int64), ('day', 'datetime64[D]'), ('code', np.int8)])
+        rows, known = self._rows_for(records['employee'])
+        columns = (records['day'] - np.datetime64(self.start, 'D')).astype(np.int64)
+        self.codes[rows[known], columns[known]] = records['code'][known]
+
+    def fill_from_packed(self, months):
+        """Fill from (employee_id, year, month, marked, statuses) tuples, decoding all months at once"""
+        if not months:
+            return
+        employee_ids, years, month_numbers, marked, statuses = zip(*months)
+        rows, known = self._rows_for(employee_ids)
+        firsts = np.array([f'{year:04d}-{month:02d}-01' for year, month in zip(years, month_numbers)], dtype='datetime64[D]')
+        day = np.arange(31, dtype=np.uint64)
+
+        is_marked = (np.array(marked, dtype=np.uint64)[:, None] >> day) & 1
+        codes = ((np.array(statuses, dtype=np.uint64)[:, None] >> (day * 2)) & 3).astype(np.int8)
+        columns = (firsts - np.datetime64(self.start, 'D')).astype(np.int64)[:, None] + day.astype(np.int64)
+        valid = (is_marked == 1) & (columns >= 0) & (columns < self.codes.shape[1]) & known[:, None]
+        self.codes[np.broadcast_to(rows[:, None], valid.shape)[valid], columns[valid]] = codes[valid]
+
+
+def load_matrix(owner, start, end):
+    """Build the owner's StatusMatrix for start..end (inclusive) with one query for employees and one for statuses"""
+    employees = list(Employee.objects.filter(owner=owner).order_by('id').values_list('id', 'name', 'emp_id', 'role'))
+    matrix = StatusMatrix(employees, start, end)
+    if settings.ATTENDANCE_STORAGE == 'packed':
+        months = PackedMonthlyAttendance.objects.filter(owner=owner).filter(months_filter(start, end))
+        matrix.fill_from_packed(list(months.values_list('employee_id', 'year', 'month', 'marked', 'statuses')))
+    else:
+        # Dates as ISO text and statuses as codes skip Django's per-row date parsing
+        records = Attendance.objects.filter(owner=owner, date__gte=start, date__lte=end).order_by().annotate(
+            day=Cast('date', CharField()),
+            code=Case(*[When(status=status, then=Value(code)) for status, code in STATUS_CODES.items()]),
+        )
+        matrix.fill_from_rows(list(records.values_list('employee_id', 'day', 'code')))
+        # Archived months are packed already
+        matrix.fill_from_packed([
+            (employee_id, year, month, marked, statuses)
+            for employee_id, owner_id, year, month, marked, statuses in archived_months(start, end, owner_id=owner.id)
+        ])
+    return matrix
+
+
+def _ratio(numerator, denominator):
+    numerator = np.asarray(numerator, dtype=np.float64)
+    return np.divide(numerator, denominator, out=np.zeros_like(numerator), where=np.asarray(denominator) > 0)
+
+
+def _cumulative(values):
+    """Running totals along days with a leading zero column, so a window sum is one subtraction"""
+    totals = np.cumsum(values, axis=-1, dtype=np.int64)
+    return np.concatenate([np.zeros(totals.shape[:-1] + (1,), dtype=np.int64), totals], axis=-1)
+
+
+def rolling_rate(absent, working, window):
+    """Absence rate over the trailing ``window`` days for every day (last axis)"""
+    absent_totals, working_totals = _cumulative(absent), _cumulative(working)
+    ends = np.arange(1, absent.shape[-1] + 1)
+    starts = np.maximum(ends - window, 0)
+    return _ratio(
+        absent_totals[..., ends] - absent_totals[..., starts],
+        working_totals[..., ends] - working_totals[..., starts],
+    )
+
+
+def absence_streaks(codes):
+    """
+    Longest and current run of absences per employee.
+
+    Unmarked days and holidays neither break nor extend a run, so a week of
+    absence around a weekend counts as one streak of working days.
+    """
+    absent = codes == ABSENT
+    neutral = (codes == UNMARKED) | (codes == HOLIDAY)
+    employees, days = codes.shape
+
+    # Carry the last non-neutral state forward over neutral days
+    last = np.maximum.accumulate(np.where(neutral, -1, np.arange(days)), axis=1)
+    in_run = np.where(last >= 0, np.take_along_axis(absent, last.clip(0), axis=1), False)
+
+    edges = np.diff(np.pad(in_run.astype(np.int8), ((0, 0), (1, 1))), axis=1)
+    run_rows, run_starts = np.nonzero(edges == 1)
+    run_ends = np.nonzero(edges == -1)[1]
+    absences = _cumulative(absent)
+    lengths = absences[run_rows, run_ends] - absences[run_rows, run_starts]
+
+    longest = np.zeros(employees, dtype=np.int64)
+    np.maximum.at(longest, run_rows, lengths)
+    current = np.zeros(employees, dtype=np.int64)
+    ongoing = run_ends == days
+    current[run_rows[ongoing]] = lengths[ongoing]
+    return longest, current
+
+
+def analyze(owner, start, end, window=30):
+    """Trends, streaks, weekday effects and rolling absenteeism for start..end, as JSON-ready data"""
+    matrix = load_matrix(owner, start, end)
+    codes = matrix.codes
+    dates = matrix.dates
+    absent = codes == ABSENT
+    present = codes == PRESENT
+    working = (codes != UNMARKED) & (codes != HOLIDAY)
+
+    # Month-by-month trend: column totals summed over each month's block of days
+    months = dates.astype('datetime64[M]')
+    boundaries = np.flatnonzero(np.r_[True, months[1:] != months[:-1]])
+    month_absent = np.add.reduceat(absent.sum(axis=0), boundaries)
+    month_present = np.add.reduceat(present.sum(axis=0), boundaries)
+    month_working = np.add.reduceat(working.sum(axis=0), boundaries)
+    trend = [
+        {
+            'month': str(month),
+            'present_rate': round(float(present_rate) * 100, 2),
+            'absence_rate': round(float(absence_rate) * 100, 2),
+            'working_days': int(days),
+        }
+        for month, present_rate, absence_rate, days in zip(
+            months[boundaries], _ratio(month_present, month_working), _ratio(month_absent, month_working), month_working
+        )
+    ]
+
+    # Weekday of each column, Monday = 0 (1970-01-01 was a Thursday)
+    weekdays = (dates.astype(np.int64) + 3) % 7
+    weekday_rates = _ratio(
+        np.bincount(weekdays, weights=absent.sum(axis=0), minlength=7),
+        np.bincount(weekdays, weights=working.sum(axis=0), minlength=7),
+    )
+
+    mondays, midweek = weekdays == 0, (weekdays >= 1) & (weekdays <= 4)
+    monday_absent, monday_working = absent[:, mondays].sum(axis=1), working[:, mondays].sum(axis=1)
+    monday_rate = _ratio(monday_absent, monday_working)
+    midweek_rate = _ratio(absent[:, midweek].sum(axis=1), working[:, midweek].sum(axis=1))
+    monday_ratio = _ratio(monday_rate, midweek_rate)
+    monday_effect = (
+        (monday_working >= MIN_MONDAYS) & (monday_absent >= 2) & (monday_rate >= MONDAY_FACTOR * midweek_rate)
+    )
+
+    absence_rate = _ratio(absent.sum(axis=1), working.sum(axis=1))
+    rolling = rolling_rate(absent, working, window)
+    longest, current = absence_streaks(codes)
+
+    # Per role: sum the rows of each role, then the same rolling window
+    roles, role_index = np.unique(np.array([employee[3] for employee in matrix.employees], dtype=object), return_inverse=True)
+    role_absent = np.zeros((len(roles), codes.shape[1]), dtype=np.int64)
+    role_working = np.zeros_like(role_absent)
+    np.add.at(role_absent, role_index, absent)
+    np.add.at(role_working, role_index, working)
+    role_rolling = rolling_rate(role_absent, role_working, window)
+
+    return {
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'window': window,
+        'dates': [str(day) for day in dates],
+        'trend': trend,
+        'weekday_absence_rate': {name: round(float(rate) * 100, 2) for name, rate in zip(WEEKDAYS, weekday_rates)},
+        'roles': [
+            {
+                'role': str(role),
+                'employees': int((role_index == index).sum()),
+                'absence_rate': round(float(_ratio(role_absent[index].sum(), role_working[index].sum())) * 100, 2),
+                'rolling_absence_rate': [round(float(rate) * 100, 2) for rate in role_rolling[index]],
+            }
+            for index, role in enumerate(roles)
+        ],
+        'employees': [
+            {
+                'id': employee_id,
+                'name': name,
+                'emp_id': emp_id,
+                'role': role,
+                'absence_rate': round(float(absence_rate[row]) * 100, 2),
+                'rolling_absence_rate': round(float(rolling[row, -1]) * 100, 2),
+                'longest_absence_streak': int(longest[row]),
+                'current_absence_streak': int(current[row]),
+                'monday_ratio': round(float(monday_ratio[row]), 2) if midweek_rate[row] > 0 else None,
+                'monday_effect': bool(monday_effect[row]),
+            }
+            for row, (employee_id, name, emp_id, role) in enumerate(matrix.employees)
+        ],
+    }
+
+
+def default_range(today):
+    """The last 365 days up to today"""
+    return today - timedelta(days=364), today
@@ -0,0 +1,131 @@
+import hashlib
+import json
+from datetime import timedelta
+from functools import wraps
+
+from django.db import IntegrityError, transaction
+from django.http import JsonResponse
+from django.utils import timezone
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
+
+from .marking import validate_records, write_rows
+from .models import ApiToken, Employee, IdempotencyKey
+
+
+MAX_RECORDS = 1000
+IDEMPOTENCY_TTL = timedelta(hours=24)
+IDEMPOTENCY_KEY_LENGTH = IdempotencyKey._meta.get_field('key').max_length
+RECORD_FIELDS = ('emp_id', 'date', 'status')
+
+
+def _error(message, status):
+    return JsonResponse({'error': message}, status=status)
+
+
+def token_required(view):
+    """Authenticate with an ``Authorization: Token <key>`` header instead of the session"""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        scheme, _, key = request.headers.get('Authorization', '').partition(' ')
+        if scheme.lower() not in ('token', 'bearer') or not key:
+            return _error('Missing API token.', 401)
+        token = ApiToken.objects.select_related('owner').filter(key=key.strip(), is_active=True).first()
+        if token is None or not token.owner.is_active:
+            return _error('Invalid API token.', 401)
+        ApiToken.objects.filter(pk=token.pk).update(last_used_at=timezone.now())
+        request.user = token.owner
+        return view(request, *args, **kwargs)
+    return wrapper
+
+
+def _record_error(record):
+    """Why a record cannot be looked up at all, or None"""
+    if not isinstance(record, dict):
+        return 'Record must be an object.'
+    for field in RECORD_FIELDS:
+        if not isinstance(record.get(field), str):
+            return f'"{field}" must be a string.'
+    return None
+
+
+def _save_records(owner, records):
+    """Validate and write a batch of emp_id based records; returns the JSON body"""
+    malformed = {index: message for index, record in enumerate(records) if (message := _record_error(record))}
+    emp_ids = {record['emp_id'] for index, record in enumerate(records) if index not in malformed}
+    employee_ids = dict(Employee.objects.filter(owner=owner, emp_id__in=emp_ids).values_list('emp_id', 'id'))
+    # Malformed records stay in place as empty ones, so indexes line up; their error is replaced below
+    resolved = [
+        {
+            'employee_id': employee_ids.get(record['emp_id']),
+            'date': record['date'],
+            'status': record['status'],
+        } if index not in malformed else {}
+        for index, record in enumerate(records)
+    ]
+
+    rows, errors = validate_records(owner, resolved)
+    write_rows(owner, rows)
+
+    failed = {index: message for index, employee_id, message in errors} | malformed
+    results = [
+        {'index': index, 'ok': False, 'error': failed[index]} if index in failed else {'index': index, 'ok': True}
+        for index in range(len(records))
+    ]
+    return {'saved': len(records) - len(failed), 'failed': len(failed), 'results': results}
+
+
+@csrf_exempt
+@require_POST
+@token_required
+def attendance_batch(request):
+    """
+    Record many attendance punches in one request.
+
+    Body: ``{"records": [{"emp_id": "E1", "date": "2025-10-05", "status": "Present"}, ...]}``.
+    Each record gets its own result, so one bad record does not reject the
+    others. Sending an ``Idempotency-Key`` header makes retries safe: the
+    first response for a key is stored with the writes and replayed for
+    identical requests.
+    """
+    try:
+        payload = json.loads(request.body)
+    except (UnicodeDecodeError, ValueError):
+        return _error('Request body must be JSON.', 400)
+    records = payload.get('records') if isinstance(payload, dict) else None
+    if not isinstance(records, list) or not records:
+        return _error('"records" must be a non-empty list.', 400)
+    if len(records) > MAX_RECORDS:
+        return _error(f'At most {MAX_RECORDS} records per request.', 400)
+
+    key = request.headers.get('Idempotency-Key', '').strip()
+    if not key:
+        return JsonResponse(_save_records(request.user, records))
+    if len(key) > IDEMPOTENCY_KEY_LENGTH:
+        return _error(f'Idempotency-Key must be at most {IDEMPOTENCY_KEY_LENGTH} characters.', 400)
+
+    request_hash = hashlib.sha256(request.body).hexdigest()
+    previous = IdempotencyKey.objects.filter(owner=request.user, key=key).first()
+    if previous is None:
+        try:
+            with transaction.atomic():
+                body = _save_records(request.user, records)
+                IdempotencyKey.objects.create(
+                    owner=request.user, key=key, request_hash=request_hash, status_code=200, response=body
+                )
+        except IntegrityError:
+            # A concurrent retry with the same key won; its writes stand and ours were rolled back
+            previous = IdempotencyKey.objects.filter(owner=request.user, key=key).first()
+            if previous is None:
+                raise
+        else:
+            IdempotencyKey.objects.filter(
+                owner=request.user, created_at__lt=timezone.now() - IDEMPOTENCY_TTL
+            ).delete()
+            return JsonResponse(body)
+
+    if previous.request_hash != request_hash:
+        return _error('Idempotency-Key was already used with a different request body.', 422)
+    response = JsonResponse(previous.response, status=previous.status_code)
+    response['Idempotent-Replayed'] = 'true'
+    return response
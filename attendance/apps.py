@@ -4,3 +4,11 @@ from django.apps import AppConfig
 class AttendanceConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'attendance'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+        from django.db.models.signals import post_migrate
+        from . import metrics, signals  # noqa: F401
+
+        post_migrate.connect(signals.ensure_search_index, sender=self)
+        connection_created.connect(metrics.install_query_wrapper)
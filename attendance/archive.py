@@ -0,0 +1,119 @@
+from datetime import date
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+
+from .models import ArchivedAttendance, Attendance, Employee, OwnerDataVersion
+from .packing import count_statuses, pack_rows, unpack
+from .summaries import months_filter
+
+
+# Employees moved per transaction
+BATCH_SIZE = 100
+
+
+def archive_cutoff(today, months=None):
+    """First day of the oldest hot month: this month and the ``months`` before it stay in Attendance"""
+    months = settings.ATTENDANCE_HOT_MONTHS if months is None else months
+    index = today.year * 12 + today.month - 1 - months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def archived_months(start, end, **filters):
+    """(employee_id, owner_id, year, month, marked, statuses) of archived months touched by start..end, oldest first"""
+    return (
+        ArchivedAttendance.objects.filter(months_filter(start, end), **filters)
+        .order_by('year', 'month', 'employee_id')
+        .values_list('employee_id', 'owner_id', 'year', 'month', 'marked', 'statuses')
+    )
+
+
+def _day_mask(year, month, start, end):
+    """``marked``-style mask of the days of a month that fall within start..end"""
+    first = start.day if (year, month) == (start.year, start.month) else 1
+    last = end.day if (year, month) == (end.year, end.month) else 31
+    return ((1 << last) - 1) & ~((1 << (first - 1)) - 1)
+
+
+def archived_counts(start, end, **filters):
+    """{(employee_id, year, month): per-status counts} of archived days in start..end (inclusive)"""
+    return {
+        (employee_id, year, month): count_statuses(marked & _day_mask(year, month, start, end), statuses)
+        for employee_id, owner_id, year, month, marked, statuses in archived_months(start, end, **filters)
+    }
+
+
+def archived_rows(start, end, **filters):
+    """(employee_id, owner_id, date, status) of archived days in start..end (inclusive)"""
+    months = archived_months(start, end, **filters).iterator(chunk_size=2000)
+    for employee_id, owner_id, year, month, marked, statuses in months:
+        for day, status in unpack(year, month, marked, statuses).items():
+            if start <= day <= end:
+                yield employee_id, owner_id, day, status
+
+
+def archived_records(employee, year, month):
+    """Unsaved Attendance objects for an archived month of ``employee``, or None when the month is not archived"""
+    year, month = int(year), int(month)
+    archived = (
+        ArchivedAttendance.objects.filter(employee=employee, year=year, month=month)
+        .values_list('marked', 'statuses')
+        .first()
+    )
+    if archived is None:
+        return None
+    return [
+        Attendance(employee=employee, owner_id=employee.owner_id, date=day, status=status)
+        for day, status in unpack(year, month, *archived).items()
+    ]
+
+
+aarchived_records = sync_to_async(archived_records)
+
+
+def _employee_batches(owner_id, batch_size):
+    employee_ids = list(Employee.objects.filter(owner_id=owner_id).order_by('id').values_list('id', flat=True))
+    for index in range(0, len(employee_ids), batch_size):
+        yield employee_ids[index:index + batch_size]
+
+
+def archive_owner(owner_id, before, batch_size=BATCH_SIZE):
+    """
+    Move one owner's attendance dated before ``before`` into ArchivedAttendance; returns the days moved.
+
+    ``before`` must be the first day of a month. Each batch of employees is
+    packed and deleted from Attendance in its own transaction; summaries keep
+    their counts, as reads combine both tables.
+    """
+    moved = 0
+    for employee_ids in _employee_batches(owner_id, batch_size):
+        with transaction.atomic():
+            rows = Attendance.objects.filter(employee__in=employee_ids, date__lt=before)
+            packed = pack_rows(rows.order_by().values_list('employee_id', 'owner_id', 'date', 'status'), ArchivedAttendance)
+            if not packed:
+                continue
+            ArchivedAttendance.objects.bulk_create(packed.values(), batch_size=1000)
+            # A plain DELETE: the collector would run the per-row summary signal
+            moved += rows._raw_delete(rows.db)
+    OwnerDataVersion.bump(owner_id)
+    return moved
+
+
+def restore_owner(owner_id, since, until=None, batch_size=BATCH_SIZE):
+    """Move one owner's archived months from ``since`` on (up to ``until``) back into Attendance; returns the days moved"""
+    recent = Q(year__gt=since.year) | Q(year=since.year, month__gte=since.month)
+    if until is not None:
+        recent &= Q(year__lt=until.year) | Q(year=until.year, month__lte=until.month)
+    moved = 0
+    for employee_ids in _employee_batches(owner_id, batch_size):
+        with transaction.atomic():
+            months = (
+                ArchivedAttendance.objects.filter(recent, employee__in=employee_ids)
+                .order_by().values_list('year', 'month').distinct()
+            )
+            for year, month in months:
+                moved += ArchivedAttendance.restore(employee_ids, year, month)
+    OwnerDataVersion.bump(owner_id)
+    return moved
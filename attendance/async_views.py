@@ -0,0 +1,220 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.decorators import login_required
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.shortcuts import aget_object_or_404, redirect, render
+from django.utils import timezone
+from django.utils.http import content_disposition_header
+from django.views.decorators.http import require_GET
+import csv
+import json
+
+from .archive import aarchived_records
+from .caching import aget_or_build, async_owner_condition
+from .events import alast_event_id, stream
+from .exports import SUMMARY_HEADER, astream_csv
+from .models import Attendance, Employee, Job, PayrollRun
+from .pagination import KeysetPage, akeyset_paginate, page_size, page_urls
+from .payroll import astream_payroll_csv
+from .reporting import amonthly_summary, build_chart_data
+from .summaries import month_start, next_month_start
+from .views import export_range_params, revalidate
+
+
+# Async counterparts of the report and download views in views.py, routed in place of
+# them when ASYNC_VIEWS is set and the app runs under ASGI (see the Procfile). Queries go
+# through the async ORM and templates are rendered in a thread, because context
+# processors touch the session and request.user synchronously.
+
+arender = sync_to_async(render)
+
+FILE_CHUNK_SIZE = 64 * 1024
+
+
+async def amonthly(owner, year, month):
+    # Same cache entry as views.cached_monthly_summary()
+    return await aget_or_build(owner, 'monthly', lambda: amonthly_summary(owner, year, month), int(year), int(month))
+
+
+@login_required
+@revalidate
+@async_owner_condition
+async def attendance_report(request):
+    owner = await request.auser()
+    month = request.GET.get('month', timezone.now().month)
+    year = request.GET.get('year', timezone.now().year)
+
+    # Read before the data, so live updates resend anything written in between
+    last_event_id = await alast_event_id(owner)
+    summary_data = await amonthly(owner, year, month)
+    chart_data = build_chart_data(summary_data)
+
+    context = {
+        'summary_data': summary_data,
+        'last_event_id': last_event_id,
+        'chart_data': json.dumps(chart_data),
+        'month': int(month),
+        'year': int(year),
+        'background_jobs': settings.ATTENDANCE_BACKGROUND_JOBS,
+    }
+    return await arender(request, 'clean_attendance_report.html', context)
+
+
+async def adetail_page(employee, year, month, after, before, size):
+    # Same page as views.detail_page()
+    archived = await aarchived_records(employee, year, month)
+    if archived is not None:
+        return KeysetPage(archived, ['date'], has_next=False, has_previous=False)
+    return await akeyset_paginate(
+        Attendance.objects.filter(
+            employee=employee,
+            date__gte=month_start(year, month),
+            date__lt=next_month_start(year, month)
+        ),
+        ['date', 'id'], after, before, size,
+    )
+
+
+@login_required
+@revalidate
+@async_owner_condition
+async def employee_detail(request, employee_id):
+    owner = await request.auser()
+    employee = await aget_object_or_404(Employee, id=employee_id, owner=owner)
+    month = request.GET.get('month', timezone.now().month)
+    year = request.GET.get('year', timezone.now().year)
+
+    after, before = request.GET.get('after'), request.GET.get('before')
+    size = page_size(request)
+
+    attendance_records = await aget_or_build(
+        owner, 'detail',
+        lambda: adetail_page(employee, year, month, after, before, size),
+        employee.id, int(year), int(month), after, before, size,
+    )
+
+    context = {
+        'employee': employee,
+        'attendance_records': attendance_records,
+        'month': int(month),
+        'year': int(year),
+        **page_urls(request, attendance_records),
+    }
+    return await arender(request, 'employee_detail.html', context)
+
+
+@login_required
+@revalidate
+@async_owner_condition
+async def export_report(request):
+    owner = await request.auser()
+    if request.GET.get('start') or request.GET.get('end'):
+        params = export_range_params(request)
+        if params is None:
+            return redirect('attendance_report')
+        start, end, layout = params
+
+        # An async iterator lets the server interleave other requests between chunks
+        response = StreamingHttpResponse(astream_csv(owner, start, end, layout), content_type='text/csv')
+        response['Content-Disposition'] = f'attachment; filename="attendance_{layout}_{start}_{end}.csv"'
+        return response
+
+    month = request.GET.get('month', timezone.now().month)
+    year = request.GET.get('year', timezone.now().year)
+
+    response = HttpResponse(content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="attendance_report_{year}_{month}.csv"'
+
+    writer = csv.writer(response)
+    writer.writerow(SUMMARY_HEADER)
+    for row in await amonthly(owner, year, month):
+        employee = row['employee']
+        writer.writerow([
+            employee.name,
+            employee.emp_id,
+            row['present'],
+            row['absent'],
+            row['leave'],
+            row['holiday'],
+            row['total_days'],
+            f"{row['percentage']:.2f}%"
+        ])
+
+    return response
+
+
+async def _aread(file, chunk_size=FILE_CHUNK_SIZE):
+    """Yield an open file in chunks, reading in a thread so the event loop is never blocked"""
+    read = sync_to_async(file.read, thread_sensitive=False)
+    try:
+        while chunk := await read(chunk_size):
+            yield chunk
+    finally:
+        await sync_to_async(file.close, thread_sensitive=False)()
+
+
+@login_required
+@require_GET
+async def job_download(request, job_id):
+    """
+    Async views.job_download().
+
+    FileResponse iterates its file synchronously, which under ASGI Django
+    does by reading the whole file into memory first.
+    """
+    owner = await request.auser()
+    job = await aget_object_or_404(Job, id=job_id, owner=owner, status='Done')
+    if not job.result_file:
+        raise Http404('This job has no file.')
+    try:
+        result = await sync_to_async(job.result_file.open)('rb')
+    except FileNotFoundError:
+        raise Http404('The export file is no longer available.')
+    response = StreamingHttpResponse(_aread(result), content_type='text/csv')
+    response['Content-Length'] = job.result_file.size
+    response['Content-Disposition'] = content_disposition_header(True, job.result_file.name.rsplit('/', 1)[-1])
+    return response
+
+
+@login_required
+@require_GET
+async def payroll_export(request, run_id):
+    owner = await request.auser()
+    run = await aget_object_or_404(PayrollRun, id=run_id, owner=owner)
+    response = StreamingHttpResponse(astream_payroll_csv(run), content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="payroll_{run.year}_{run.month:02d}_{run.id}.csv"'
+    return response
+
+
+def _int_param(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+@login_required
+async def attendance_events(request):
+    """
+    Server-sent events with the owner's live counts; see events.stream().
+
+    Pages pass the event id of the data they were rendered from as ``last``,
+    so a stream only sends what changed since. ``year`` and ``month`` add that
+    report month's changed rows to each event.
+    """
+    owner = await request.auser()
+    last_id = request.headers.get('Last-Event-ID') or request.GET.get('last')
+    year, month = _int_param(request.GET.get('year')), _int_param(request.GET.get('month'))
+    if year is None or month not in range(1, 13):
+        year = month = None
+
+    events = stream(owner, last_id, year, month)
+    if settings.ASYNC_VIEWS:
+        response = StreamingHttpResponse(events, content_type='text/event-stream')
+    else:
+        # Under WSGI the stream ends after one event; send it as a plain response
+        response = HttpResponse(''.join([event async for event in events]), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Stop nginx from buffering events
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -0,0 +1,199 @@
+import math
+import platform
+import random
+import statistics
+import time
+import tracemalloc
+from datetime import timedelta
+
+import django
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import connection
+from django.db.models import Max
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import Attendance, Employee, OwnerDataVersion
+from .seeding import create_owners, remove_owner, seed_owner
+
+
+VIEWS = ['dashboard', 'mark_attendance', 'attendance_report', 'employee_detail', 'export_report', 'export_range']
+# Compared against a baseline; the rest are informational
+COMPARED = ['p50', 'queries']
+
+
+class QueryTimer:
+    """Database execute wrapper adding up the time spent in queries"""
+
+    def __init__(self):
+        self.seconds = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        # CaptureQueriesContext records times as strings rounded to the millisecond
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - started
+
+
+def parse_size(value):
+    """'500x90' -> (500, 90) employees x days"""
+    employees, _, days = value.lower().partition('x')
+    employees, days = int(employees), int(days)
+    if employees < 1 or days < 1:
+        raise ValueError(value)
+    return employees, days
+
+
+def bench_owner(employees, days, reseed=False):
+    """The benchmark owner for a data size, seeding it (deterministically, up to today) when missing or stale"""
+    username = f'bench-{employees}x{days}'
+    owner = User.objects.filter(username=username).first()
+    if owner is not None and not reseed and Employee.objects.filter(owner=owner).count() == employees:
+        return owner
+    if owner is not None:
+        remove_owner(owner)
+    # Requests log in with force_login, so the account gets an unusable password
+    [owner] = create_owners([username], None)
+    seed_owner(owner, employees, days, timezone.now().date(), random.Random(0))
+    return owner
+
+
+def view_urls(owner, views):
+    """(view, url) pairs for ``owner``, dated at its latest attendance"""
+    end = Attendance.objects.filter(owner=owner).aggregate(last=Max('date'))['last'] or timezone.now().date()
+    start = end - timedelta(days=89)
+    employee = Employee.objects.filter(owner=owner).order_by('id').first()
+    month = f'month={end.month}&year={end.year}'
+    urls = {
+        'dashboard': reverse('dashboard'),
+        'mark_attendance': f'{reverse("mark_attendance")}?date={end}',
+        'attendance_report': f'{reverse("attendance_report")}?{month}',
+        'employee_detail': f'{reverse("employee_detail", args=[employee.id])}?{month}',
+        'export_report': f'{reverse("export_report")}?{month}',
+        'export_range': f'{reverse("export_report")}?start={start}&end={end}',
+    }
+    return [(view, urls[view]) for view in views]
+
+
+def _percentile(ordered, fraction):
+    return ordered[min(len(ordered) - 1, math.ceil(fraction * len(ordered)) - 1)]
+
+
+async def _aconsume(content):
+    return b''.join([chunk async for chunk in content])
+
+
+def _fetch(client, url):
+    response = client.get(url)
+    # Streaming exports do their work while being consumed
+    if not response.streaming:
+        body = response.content
+    elif response.is_async:
+        body = async_to_sync(_aconsume)(response.streaming_content)
+    else:
+        body = b''.join(response.streaming_content)
+    return response.status_code, len(body)
+
+
+def measure(client, owner, url, repeat, cold=False):
+    """Latency percentiles (ms), query count, SQL time and peak memory of ``repeat`` requests to ``url``"""
+    def request():
+        if cold:
+            OwnerDataVersion.bump(owner.id)
+        return _fetch(client, url)
+
+    started = time.perf_counter()
+    status, size = request()
+    first = (time.perf_counter() - started) * 1000
+
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        request()
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+
+    timer = QueryTimer()
+    with CaptureQueriesContext(connection) as queries, connection.execute_wrapper(timer):
+        request()
+    # Read now: the next request resets the connection's query log
+    captured = queries.captured_queries
+    # Separate pass: tracing allocations slows the request down
+    tracemalloc.start()
+    try:
+        request()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    return {
+        'status': status,
+        'response_bytes': size,
+        'latency_ms': {
+            'first': round(first, 2),
+            'min': round(timings[0], 2),
+            'p50': round(_percentile(timings, 0.5), 2),
+            'p90': round(_percentile(timings, 0.9), 2),
+            'p99': round(_percentile(timings, 0.99), 2),
+            'max': round(timings[-1], 2),
+            'mean': round(statistics.fmean(timings), 2),
+        },
+        'queries': len(captured),
+        'sql_ms': round(timer.seconds * 1000, 2),
+        'peak_memory_kib': round(peak / 1024),
+    }
+
+
+def run(sizes, views=VIEWS, repeat=20, cold=False, reseed=False, label='', progress=None):
+    """Benchmark ``views`` at each (employees, days) size; returns a JSON-ready report"""
+    results = []
+    for employees, days in sizes:
+        owner = bench_owner(employees, days, reseed)
+        client = Client()
+        client.force_login(owner)
+        for view, url in view_urls(owner, views):
+            result = {'size': f'{employees}x{days}', 'view': view, 'url': url, **measure(client, owner, url, repeat, cold)}
+            results.append(result)
+            if progress:
+                progress(result)
+    return {
+        'meta': {
+            'label': label,
+            'timestamp': timezone.now().isoformat(),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': connection.vendor,
+            'storage': settings.ATTENDANCE_STORAGE,
+            'async_views': settings.ASYNC_VIEWS,
+            'repeat': repeat,
+            'cold': cold,
+        },
+        'results': results,
+    }
+
+
+def _metric(result, metric):
+    return result['latency_ms'].get(metric, result.get(metric))
+
+
+def compare(report, baseline, tolerance):
+    """Regressions of ``report`` against ``baseline``: (size, view, metric, old, new) beyond ``tolerance`` times"""
+    old = {(result['size'], result['view']): result for result in baseline['results']}
+    regressions = []
+    for result in report['results']:
+        before = old.get((result['size'], result['view']))
+        if before is None:
+            continue
+        for metric in COMPARED:
+            then, now = _metric(before, metric), _metric(result, metric)
+            # Query counts are exact, so any increase counts
+            limit = then if metric == 'queries' else then * tolerance
+            if now > limit:
+                regressions.append((result['size'], result['view'], metric, then, now))
+    return regressions
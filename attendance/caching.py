@@ -0,0 +1,141 @@
+import hashlib
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib import messages
+from django.core.cache import cache
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.utils import timezone
+from django.views.decorators.http import condition
+
+from .models import OwnerDataVersion
+
+
+KEY_PREFIX = 'attendance'
+MISSING = object()
+
+
+def _counter(owner_id):
+    # A plain read, so reports served from a replica key their cache and ETag by the
+    # version that replica has reached rather than by the primary's newer one
+    try:
+        return OwnerDataVersion.objects.get(owner_id=owner_id)
+    except OwnerDataVersion.DoesNotExist:
+        return OwnerDataVersion.objects.get_or_create(owner_id=owner_id)[0]
+
+
+def data_version(owner):
+    """Current data version for an owner, creating the counter on first use"""
+    return _counter(owner.pk).version
+
+
+async def adata_version(owner):
+    try:
+        version = await OwnerDataVersion.objects.aget(owner_id=owner.pk)
+    except OwnerDataVersion.DoesNotExist:
+        version, created = await OwnerDataVersion.objects.aget_or_create(owner_id=owner.pk)
+    return version.version
+
+
+def _request_version(request):
+    # Both validators are computed for the same request; fetch the counter once
+    if not hasattr(request, '_attendance_data_version'):
+        request._attendance_data_version = _counter(request.user.pk)
+    return request._attendance_data_version
+
+
+def owner_etag(request, *args, **kwargs):
+    """
+    ETag for pages built only from the owner's data.
+
+    The data version changes on every write, including deletes, so it is a
+    safer validator than the newest updated_at. Today's date is part of it,
+    as pages without a period in the query string (this month's report, the
+    last 365 days of analytics, today's grid) show a different one tomorrow.
+    Pages carrying a pending flash message are never answered with 304, so
+    the message is shown.
+    """
+    if len(messages.get_messages(request)):
+        return None
+    # Pages embed a CSRF token, which stops matching when the cookie rotates at login
+    csrf = hashlib.md5(request.COOKIES.get(settings.CSRF_COOKIE_NAME, '').encode(), usedforsecurity=False).hexdigest()[:8]
+    today = timezone.now().date().isoformat()
+    return f'"{request.user.pk}-{_request_version(request).version}-{today}-{csrf}"'
+
+
+def owner_last_modified(request, *args, **kwargs):
+    if len(messages.get_messages(request)):
+        return None
+    # Not before midnight, for the same reason the ETag carries today's date
+    midnight = timezone.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    return max(_request_version(request).updated_at, midnight)
+
+
+def _owner_validators(request):
+    return owner_etag(request), owner_last_modified(request)
+
+
+def _validated(response):
+    # condition() adds the validators to whatever the view returns. A redirect or an
+    # error must not carry them, or the browser could revalidate it into a 304 later.
+    if response.status_code not in (200, 304):
+        del response['ETag']
+        del response['Last-Modified']
+    return response
+
+
+def owner_condition(view):
+    """condition(owner_etag, owner_last_modified), with validators only on successful pages"""
+    conditional = condition(etag_func=owner_etag, last_modified_func=owner_last_modified)(view)
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        return _validated(conditional(request, *args, **kwargs))
+    return wrapper
+
+
+def async_owner_condition(view):
+    """
+    owner_condition() for async views.
+
+    condition() calls its validators synchronously, but these read the
+    session and the database, so they are computed in a thread first.
+    """
+    conditional = condition(
+        etag_func=lambda request, *args, **kwargs: request._owner_validators[0],
+        last_modified_func=lambda request, *args, **kwargs: request._owner_validators[1],
+    )(view)
+
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        request._owner_validators = await sync_to_async(_owner_validators)(request)
+        return _validated(await conditional(request, *args, **kwargs))
+    return wrapper
+
+
+def cache_key(owner, version, name, *parts):
+    # Parts may carry user input (name filters, cursors); hash them into a backend-safe key
+    digest = hashlib.md5(repr(parts).encode(), usedforsecurity=False).hexdigest()
+    return f'{KEY_PREFIX}:{owner.pk}:{version}:{name}:{digest}'
+
+
+def get_or_build(owner, name, builder, *parts, timeout=DEFAULT_TIMEOUT):
+    """
+    Return the cached value for (owner, name, *parts) or store what builder() returns.
+
+    Keys include the owner's data version, so entries written before a
+    change are never read again and simply age out of the backend.
+    """
+    key = cache_key(owner, data_version(owner), name, *parts)
+    return cache.get_or_set(key, builder, timeout)
+
+
+async def aget_or_build(owner, name, builder, *parts, timeout=DEFAULT_TIMEOUT):
+    """Async get_or_build(); ``builder`` returns an awaitable and shares keys with the sync version"""
+    key = cache_key(owner, await adata_version(owner), name, *parts)
+    value = await cache.aget(key, MISSING)
+    if value is MISSING:
+        value = await builder()
+        await cache.aset(key, value, timeout)
+    return value
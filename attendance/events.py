@@ -0,0 +1,161 @@
+import asyncio
+import json
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connections
+from django.db.models import Count
+from django.utils import timezone
+
+from .models import Attendance, Employee, MonthlyAttendanceSummary, OwnerDataVersion
+from .summaries import COUNT_FIELDS, STATUSES
+
+
+# Summary rows changed this long before the last event are sent again, covering clock skew between servers
+SKEW = timedelta(seconds=2)
+KEEPALIVE_SECONDS = 20
+
+_listeners = {}
+_lock = threading.Lock()
+
+
+def notify(*owner_ids):
+    """Wake this process's event streams for these owners; OwnerDataVersion.bump() calls it on commit"""
+    with _lock:
+        targets = [listener for owner_id in owner_ids for listener in _listeners.get(owner_id, ())]
+    for loop, changed in targets:
+        try:
+            loop.call_soon_threadsafe(changed.set)
+        except RuntimeError:
+            # The stream's event loop has shut down
+            pass
+
+
+@contextmanager
+def listening(owner_id):
+    """An asyncio.Event set whenever the owner's data changes in this process"""
+    listener = (asyncio.get_running_loop(), asyncio.Event())
+    with _lock:
+        _listeners.setdefault(owner_id, set()).add(listener)
+    try:
+        yield listener[1]
+    finally:
+        with _lock:
+            _listeners[owner_id].discard(listener)
+            if not _listeners[owner_id]:
+                del _listeners[owner_id]
+
+
+async def _wait(changed, timeout):
+    try:
+        await asyncio.wait_for(changed.wait(), timeout)
+    except asyncio.TimeoutError:
+        pass
+    changed.clear()
+
+
+def day_counts(owner, day):
+    """{field: count} of the owner's statuses on ``day``, keyed like COUNT_FIELDS"""
+    counts = dict(Attendance.objects.filter(owner=owner, date=day).order_by().values_list('status').annotate(Count('id')))
+    return {status.lower(): counts.get(status, 0) for status in STATUSES}
+
+
+def snapshot(owner, year=None, month=None, since=None):
+    """
+    Event payload: employee count, today's status counts and, for a report month, changed summary rows.
+
+    ``rows`` maps employee ids to [present, absent, leave, holiday] for the
+    month's summaries updated after ``since``, or all of them when it is None.
+    """
+    today = timezone.now().date()
+    payload = {
+        'employees': Employee.objects.filter(owner=owner).count(),
+        'today': {'date': today.isoformat(), **day_counts(owner, today)},
+    }
+    if year and month:
+        summaries = MonthlyAttendanceSummary.objects.filter(owner=owner, year=year, month=month)
+        if since is not None:
+            summaries = summaries.filter(updated_at__gt=since - SKEW)
+        payload['month'] = {
+            'year': year,
+            'month': month,
+            'rows': {employee_id: counts for employee_id, *counts in summaries.values_list('employee_id', *COUNT_FIELDS)},
+        }
+    return payload
+
+
+def _counter(owner_id):
+    return OwnerDataVersion.objects.filter(owner_id=owner_id).values_list('version', 'updated_at').first() or (0, None)
+
+
+def _event_id(version, updated_at):
+    return f'{version}:{updated_at.timestamp()}' if updated_at else str(version)
+
+
+def parse_event_id(value):
+    """(version, updated_at) from an event id, or (None, None) when it is malformed"""
+    version, _, timestamp = (value or '').partition(':')
+    try:
+        return int(version), datetime.fromtimestamp(float(timestamp), dt_timezone.utc) if timestamp else None
+    except (ValueError, OverflowError, OSError):
+        return None, None
+
+
+def last_event_id(owner):
+    """Event id of the owner's current data, for pages to start their stream from"""
+    return _event_id(*_counter(owner.pk))
+
+
+async def alast_event_id(owner):
+    return _event_id(*await sync_to_async(_counter)(owner.pk))
+
+
+def _released(function):
+    """``function`` run through sync_to_async, closing the thread's connections after each call"""
+    def run(*args):
+        try:
+            return function(*args)
+        finally:
+            if settings.ASYNC_VIEWS:
+                # Each ASGI request has its own thread, whose connection would otherwise stay
+                # open until the stream ends, one per open tab
+                connections.close_all()
+    return sync_to_async(run)
+
+
+async def stream(owner, last_id=None, year=None, month=None):
+    """
+    Yield server-sent events for ``owner``: one ``attendance`` event per data version after ``last_id``.
+
+    Event ids carry the version and the time it was reached, so a client
+    resuming from one only gets the summary rows changed since. Changes made
+    in this process wake the stream at once; others are found by polling the
+    version every ATTENDANCE_EVENTS_POLL_SECONDS. Under WSGI, which would tie
+    up a worker thread per open stream, a stream sends at most one event and
+    the browser reconnects after the poll interval instead.
+    """
+    poll = settings.ATTENDANCE_EVENTS_POLL_SECONDS
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + settings.ATTENDANCE_EVENTS_MAX_SECONDS
+    version, since = parse_event_id(last_id)
+    counter, build = _released(_counter), _released(snapshot)
+    with listening(owner.id) as changed:
+        current, updated_at = await counter(owner.id)
+        yield f'retry: {poll * 1000}\n\n'
+        idle = loop.time()
+        while True:
+            if version != current:
+                payload = await build(owner, year, month, since)
+                data = json.dumps(payload, separators=(',', ':'))
+                yield f'id: {_event_id(current, updated_at)}\nevent: attendance\ndata: {data}\n\n'
+                version, since, idle = current, updated_at, loop.time()
+            elif loop.time() - idle >= KEEPALIVE_SECONDS:
+                yield ': keepalive\n\n'
+                idle = loop.time()
+            if not settings.ASYNC_VIEWS or loop.time() >= deadline:
+                return
+            await _wait(changed, poll)
+            current, updated_at = await counter(owner.id)
@@ -0,0 +1,165 @@
+import csv
+from heapq import merge
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from django.db.models import Count, Q
+
+from .archive import archived_counts, archived_months
+from .models import ArchivedAttendance, Attendance, Employee
+from .packing import unpack
+from .summaries import COUNT_FIELDS, STATUSES, add_counts, months_filter
+
+
+CHUNK_SIZE = 2000
+LAYOUTS = ('daily', 'summary')
+
+DAILY_HEADER = ['Date', 'Employee Name', 'Employee ID', 'Role', 'Status']
+SUMMARY_HEADER = ['Employee Name', 'Employee ID', 'Present Days', 'Absent Days', 'Leave Days', 'Holiday Days', 'Total Days', 'Attendance %']
+
+DAILY_FIELDS = ('date', 'employee__name', 'employee__emp_id', 'employee__role', 'status')
+SUMMARY_FIELDS = ('name', 'emp_id', *[status.lower() for status in STATUSES])
+
+
+class Echo:
+    """File-like object whose write() hands the line straight back to the caller"""
+
+    def write(self, value):
+        return value
+
+
+def _daily_records(owner, start, end):
+    return (
+        Attendance.objects.filter(owner=owner, date__gte=start, date__lte=end)
+        .order_by('date', 'employee__name', 'employee_id')
+    )
+
+
+def _daily_row(day, name, emp_id, role, status):
+    return [day.isoformat(), name, emp_id, role, status]
+
+
+def _daily_key(record):
+    # The ordering of _daily_records(), for records that end in employee_id
+    return record[0], record[1], record[5]
+
+
+def _archived_daily_records(owner, start, end):
+    """Archived days as _daily_records() values plus employee_id, in the same order, decoded a month at a time"""
+    months = archived_months(start, end, owner_id=owner.id)
+    if not months.exists():
+        return
+    employees = {
+        employee_id: (name, emp_id, role) for employee_id, name, emp_id, role
+        in Employee.objects.filter(owner=owner).values_list('id', 'name', 'emp_id', 'role')
+    }
+    current, records = None, []
+    for employee_id, owner_id, year, month, marked, statuses in months.iterator(chunk_size=CHUNK_SIZE):
+        if (year, month) != current:
+            yield from sorted(records, key=_daily_key)
+            current, records = (year, month), []
+        name, emp_id, role = employees[employee_id]
+        records += [
+            (day, name, emp_id, role, status, employee_id)
+            for day, status in unpack(year, month, marked, statuses).items()
+            if start <= day <= end
+        ]
+    yield from sorted(records, key=_daily_key)
+
+
+def _summary_employees(owner, start, end):
+    in_range = Q(attendance__date__gte=start, attendance__date__lte=end)
+    return Employee.objects.filter(owner=owner).annotate(**{
+        status.lower(): Count('attendance', filter=in_range & Q(attendance__status=status))
+        for status in STATUSES
+    })
+
+
+def _summary_row(name, emp_id, present, absent, leave, holiday):
+    total_days = present + absent + leave + holiday
+    percentage = (present / total_days * 100) if total_days > 0 else 0
+    return [name, emp_id, present, absent, leave, holiday, total_days, f"{percentage:.2f}%"]
+
+
+def daily_rows(owner, start, end):
+    """One row per attendance record in start..end (inclusive), in date order, archived days included"""
+    # iterator() streams the rows; on Postgres it uses a server-side cursor
+    records = _daily_records(owner, start, end).values_list(*DAILY_FIELDS, 'employee_id').iterator(chunk_size=CHUNK_SIZE)
+    for record in merge(records, _archived_daily_records(owner, start, end), key=_daily_key):
+        yield _daily_row(*record[:5])
+
+
+def summary_rows(owner, start, end):
+    """One row per employee with status counts for start..end (inclusive), archived days included"""
+    archived = {}
+    for (employee_id, year, month), counts in archived_counts(start, end, owner_id=owner.id).items():
+        add_counts(archived.setdefault(employee_id, {}), counts)
+
+    employees = _summary_employees(owner, start, end).values_list('id', *SUMMARY_FIELDS)
+    for employee_id, name, emp_id, *counts in employees.iterator(chunk_size=CHUNK_SIZE):
+        if employee_id in archived:
+            counts = [count + archived[employee_id][field] for count, field in zip(counts, COUNT_FIELDS)]
+        yield _summary_row(name, emp_id, *counts)
+
+
+def stream_csv(owner, start, end, layout='daily'):
+    """Yield encoded CSV lines for the requested layout without building the file in memory"""
+    if layout == 'summary':
+        header, rows = SUMMARY_HEADER, summary_rows(owner, start, end)
+    else:
+        header, rows = DAILY_HEADER, daily_rows(owner, start, end)
+
+    writer = csv.writer(Echo())
+    yield writer.writerow(header)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+async def astream_csv(owner, start, end, layout='daily'):
+    """Async stream_csv(): rows come from aiterator(), so no worker thread is held between chunks"""
+    if await ArchivedAttendance.objects.filter(owner=owner).filter(months_filter(start, end)).aexists():
+        # Merging in archived months is synchronous; run stream_csv() a chunk at a time in the ORM's thread
+        lines = stream_csv(owner, start, end, layout)
+        take = sync_to_async(lambda: list(islice(lines, CHUNK_SIZE)))
+        while chunk := await take():
+            for line in chunk:
+                yield line
+        return
+
+    if layout == 'summary':
+        header, fields, make_row = SUMMARY_HEADER, SUMMARY_FIELDS, _summary_row
+        records = _summary_employees(owner, start, end)
+    else:
+        header, fields, make_row = DAILY_HEADER, DAILY_FIELDS, _daily_row
+        records = _daily_records(owner, start, end)
+
+    writer = csv.writer(Echo())
+    yield writer.writerow(header)
+    # values(), not values_list(): ValuesListIterable runs its query before
+    # aiterator() can move it to a thread, which fails in an async context
+    async for record in records.values(*fields).aiterator(chunk_size=CHUNK_SIZE):
+        yield writer.writerow(make_row(*[record[field] for field in fields]))
+
+
+def pivot_rows(pivot):
+    """CSV header and rows for a reporting.range_pivot(): per-status counts and % for each month, then totals"""
+    columns = ['Present', 'Absent', 'Leave', 'Holiday', 'Attendance %']
+    header = ['Employee Name', 'Employee ID']
+    for month in pivot['months']:
+        header += [f'{month:%b %Y} {column}' for column in columns]
+    header += [f'Total {column}' for column in columns]
+    yield header
+
+    def cells(cell):
+        return [cell['present'], cell['absent'], cell['leave'], cell['holiday'], f"{cell['percentage']:.2f}%"]
+
+    for row in pivot['rows']:
+        line = [row['name'], row['emp_id']]
+        for cell in row['months']:
+            line += cells(cell)
+        yield line + cells(row['total'])
+
+    line = ['All employees', '']
+    for cell in pivot['totals']:
+        line += cells(cell)
+    yield line + cells(pivot['total'])
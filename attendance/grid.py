@@ -0,0 +1,86 @@
+from .archive import archived_rows
+from .models import Attendance, Employee
+from .packing import CODE_STATUSES, STATUS_CODES
+from .summaries import STATUSES
+
+
+# Cells accepted per save; the page only sends the ones that changed
+MAX_CHANGES = 5000
+# Largest value of a signed 64-bit primary key
+MAX_ID = 2 ** 63 - 1
+
+
+def is_db_id(value):
+    """Whether an integer fits a primary key; larger values would overflow the database's integer parameters"""
+    return 0 < value <= MAX_ID
+
+
+def day_statuses(owner, day, employee_ids=None):
+    """{employee_id: status} of the owner's attendance on ``day``, hot and archived"""
+    hot = Attendance.objects.filter(owner=owner, date=day)
+    archived = {'owner_id': owner.id}
+    if employee_ids is not None:
+        hot = hot.filter(employee_id__in=employee_ids)
+        archived['employee__in'] = employee_ids
+    return {
+        **dict(hot.values_list('employee_id', 'status')),
+        **{employee_id: status for employee_id, owner_id, date, status in archived_rows(day, day, **archived)},
+    }
+
+
+def grid_payload(owner, day, role='', prefix=''):
+    """
+    The mark attendance grid for ``day`` as parallel columns, one entry per employee.
+
+    ``codes`` holds each employee's status as its index in ``statuses`` (null
+    when unmarked) and ``roles`` indexes into ``role_names``, so a large
+    roster costs a few bytes per employee beyond the names.
+    """
+    employees = Employee.objects.filter(owner=owner)
+    if role:
+        employees = employees.filter(role=role)
+    if prefix:
+        employees = employees.filter(name__istartswith=prefix)
+    rows = list(employees.order_by('name', 'id').values_list('id', 'name', 'emp_id', 'role'))
+
+    # Unfiltered, the whole roster is wanted and the id list is only overhead
+    statuses = day_statuses(owner, day, [row[0] for row in rows] if role or prefix else None)
+    role_names = sorted({row[3] for row in rows})
+    role_index = {name: index for index, name in enumerate(role_names)}
+    return {
+        'date': day.isoformat(),
+        'statuses': list(STATUSES),
+        'role_names': role_names,
+        'ids': [row[0] for row in rows],
+        'names': [row[1] for row in rows],
+        'emp_ids': [row[2] for row in rows],
+        'roles': [role_index[row[3]] for row in rows],
+        'codes': [STATUS_CODES.get(statuses.get(row[0])) for row in rows],
+    }
+
+
+def parse_changes(payload):
+    """
+    Attendance records from a grid save body ``{"date": ..., "ids": [...], "codes": [...]}``.
+
+    Raises ValueError when the body is malformed, including ids outside the
+    range of a database id and unknown status codes; per-record problems
+    (unknown employees, bad dates) are left to validate_records().
+    """
+    if not isinstance(payload, dict):
+        raise ValueError('Body must be a JSON object.')
+    ids, codes = payload.get('ids'), payload.get('codes')
+    if not isinstance(ids, list) or not isinstance(codes, list) or len(ids) != len(codes):
+        raise ValueError('"ids" and "codes" must be lists of the same length.')
+    if not all(isinstance(value, int) and not isinstance(value, bool) for value in ids + codes):
+        raise ValueError('"ids" and "codes" must hold integers.')
+    if not all(is_db_id(employee_id) for employee_id in ids):
+        raise ValueError('"ids" must hold employee ids.')
+    if not all(code in CODE_STATUSES for code in codes):
+        raise ValueError(f'"codes" must be indexes into {list(CODE_STATUSES.values())}.')
+    if len(ids) > MAX_CHANGES:
+        raise ValueError(f'At most {MAX_CHANGES} cells can be saved at once.')
+    return [
+        {'employee_id': employee_id, 'date': payload.get('date'), 'status': CODE_STATUSES[code]}
+        for employee_id, code in zip(ids, codes)
+    ]
@@ -0,0 +1,162 @@
+import csv
+from datetime import datetime
+from itertools import islice
+
+from django.core.exceptions import ValidationError
+
+from .marking import VALID_STATUSES, write_rows
+from .models import Employee, OwnerDataVersion
+
+
+KINDS = ('employees', 'attendance')
+REQUIRED_COLUMNS = {
+    'employees': ['name', 'emp_id', 'role', 'salary'],
+    'attendance': ['emp_id', 'date', 'status'],
+}
+DATE_FORMATS = ['%Y-%m-%d', '%d/%m/%Y']
+MAX_REPORTED_ERRORS = 100
+
+
+class ImportReport:
+    """Running totals for one import; only the first errors are kept so memory stays bounded"""
+
+    def __init__(self):
+        self.processed = 0
+        self.saved = 0
+        self.error_count = 0
+        self.errors = []
+
+    def add_error(self, line, message):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append(f'Line {line}: {message}')
+
+
+class ImportAborted(ValueError):
+    """The file could not be read to the end; ``report`` covers the batches committed before that"""
+
+    def __init__(self, error, report):
+        self.report = report
+        if report.processed:
+            detail = (
+                f'Rows up to line {report.processed + 1} were imported ({report.saved} saved); '
+                f'import the file again from line {report.processed + 2}.'
+            )
+        else:
+            detail = 'Nothing was imported.'
+        super().__init__(f'{error}. {detail}')
+
+
+def _parse_date(value):
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, date_format).date()
+        except ValueError:
+            continue
+    raise ValueError(value)
+
+
+def _batches(reader, batch_size):
+    # Data starts on line 2, after the header
+    numbered = enumerate(reader, start=2)
+    while True:
+        batch = list(islice(numbered, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+def _import_employees(owner, batch, report, seen_emp_ids):
+    emp_ids = {(row.get('emp_id') or '').strip() for line, row in batch}
+    taken = set(Employee.objects.filter(emp_id__in=emp_ids).values_list('emp_id', flat=True))
+
+    employees = []
+    for line, row in batch:
+        employee = Employee(
+            owner=owner,
+            name=(row.get('name') or '').strip(),
+            emp_id=(row.get('emp_id') or '').strip(),
+            role=(row.get('role') or '').strip(),
+            salary=(row.get('salary') or '').strip() or None,
+        )
+        try:
+            employee.clean_fields(exclude=['owner'])
+        except ValidationError as e:
+            errors = '; '.join(f'{field}: {" ".join(messages)}' for field, messages in e.message_dict.items())
+            report.add_error(line, errors)
+            continue
+        if employee.emp_id in taken or employee.emp_id in seen_emp_ids:
+            report.add_error(line, f'Employee ID "{employee.emp_id}" already exists.')
+            continue
+        seen_emp_ids.add(employee.emp_id)
+        employees.append(employee)
+
+    Employee.objects.bulk_create(employees)
+    OwnerDataVersion.bump(owner.id)
+    report.saved += len(employees)
+
+
+def _import_attendance(owner, batch, report, use_copy):
+    emp_ids = {(row.get('emp_id') or '').strip() for line, row in batch}
+    employee_ids = dict(Employee.objects.filter(owner=owner, emp_id__in=emp_ids).values_list('emp_id', 'id'))
+
+    rows = {}
+    for line, row in batch:
+        emp_id = (row.get('emp_id') or '').strip()
+        status = (row.get('status') or '').strip().capitalize()
+        if emp_id not in employee_ids:
+            report.add_error(line, f'Unknown employee ID "{emp_id}".')
+            continue
+        if status not in VALID_STATUSES:
+            report.add_error(line, f'Invalid status "{row.get("status")}".')
+            continue
+        try:
+            day = _parse_date((row.get('date') or '').strip())
+        except ValueError:
+            report.add_error(line, f'Invalid date "{row.get("date")}".')
+            continue
+        # A later row for the same employee and day wins
+        rows[(employee_ids[emp_id], day)] = status
+
+    write_rows(owner, rows, use_copy=use_copy)
+    report.saved += len(rows)
+
+
+def import_csv(owner, csv_file, kind, batch_size=1000, progress=None):
+    """
+    Stream rows from an open text-mode CSV file into the owner's employees or attendance.
+
+    Rows are read, validated and written ``batch_size`` at a time, so memory
+    use does not depend on the file size. Each batch is committed on its
+    own; a bad row is reported and skipped without aborting the file.
+    ``progress`` is called with the report after every batch. Raises
+    ValueError when the header is missing a required column, and
+    ImportAborted, saying which lines were saved, when the file turns out
+    not to be valid UTF-8 or CSV partway through.
+    """
+    if kind not in KINDS:
+        raise ValueError(f'Unknown import type "{kind}".')
+    reader = csv.DictReader(csv_file)
+    try:
+        header = [column.strip() for column in reader.fieldnames or []]
+    except csv.Error as e:
+        raise ValueError(f'Invalid CSV file: {e}')
+    missing = [column for column in REQUIRED_COLUMNS[kind] if column not in header]
+    if missing:
+        raise ValueError(f'Missing column(s): {", ".join(missing)}.')
+    reader.fieldnames = header
+
+    report = ImportReport()
+    seen_emp_ids = set()
+    try:
+        for batch in _batches(reader, batch_size):
+            if kind == 'employees':
+                _import_employees(owner, batch, report, seen_emp_ids)
+            else:
+                _import_attendance(owner, batch, report, use_copy=True)
+            report.processed += len(batch)
+            if progress:
+                progress(report)
+    except (UnicodeDecodeError, csv.Error) as e:
+        raise ImportAborted(e, report) from e
+    return report
@@ -0,0 +1,160 @@
+import os
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+
+from .exports import LAYOUTS, stream_csv
+from .marking import parse_day
+from .models import Job
+from .summaries import month_start, next_month_start, rebuild_owner
+
+
+def _date_range(data):
+    try:
+        start = parse_day(data.get('start'))
+        end = parse_day(data.get('end'))
+    except (TypeError, ValueError):
+        raise ValueError('Please select a valid start and end date.')
+    if start > end:
+        raise ValueError('The start date must not be after the end date.')
+    return start, end
+
+
+def _clean_export(data):
+    start, end = _date_range(data)
+    layout = data.get('layout', 'daily')
+    if layout not in LAYOUTS:
+        raise ValueError(f'Unknown export layout "{layout}".')
+    return {'start': start.isoformat(), 'end': end.isoformat(), 'layout': layout}
+
+
+def _clean_summaries(data):
+    try:
+        year, month = int(data.get('year')), int(data.get('month'))
+        month_start(year, month)
+    except (TypeError, ValueError):
+        raise ValueError('Please select a valid month and year.')
+    return {'year': year, 'month': month}
+
+
+def _run_export(job):
+    start, end = parse_day(job.params['start']), parse_day(job.params['end'])
+    layout = job.params['layout']
+    name = f'exports/{job.owner_id}/{job.id}/attendance_{layout}_{start}_{end}.csv'
+    path = os.path.join(settings.MEDIA_ROOT, name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    lines = 0
+    with open(path, 'w', newline='', encoding='utf-8') as output:
+        for line in stream_csv(job.owner, start, end, layout):
+            output.write(line)
+            lines += 1
+    job.result_file.name = name
+    return f'{lines - 1} rows exported'
+
+
+def _run_summaries(job):
+    year, month = job.params['year'], job.params['month']
+    start = month_start(year, month)
+    end = next_month_start(year, month) - timedelta(days=1)
+    return f'{rebuild_owner(job.owner_id, start, end)} summaries rebuilt for {start:%B %Y}'
+
+
+# kind -> (validate form data into JSON params, run the job and return a short message)
+KINDS = {
+    'export': (_clean_export, _run_export),
+    'summaries': (_clean_summaries, _run_summaries),
+}
+
+
+def clean_params(kind, data):
+    """Validate the request data for a ``kind`` job into its params; raises ValueError with a user-facing message"""
+    if kind not in KINDS:
+        raise ValueError(f'Unknown job type "{kind}".')
+    clean, run = KINDS[kind]
+    return clean(data)
+
+
+def submit(owner, kind, data):
+    """Validate the request data for ``kind`` and queue a job; raises ValueError with a user-facing message"""
+    return Job.objects.create(owner=owner, kind=kind, params=clean_params(kind, data))
+
+
+def run_now(owner, kind, params):
+    """
+    Do a job's work in the calling process without queueing it; returns its message.
+
+    For deployments without a worker (ATTENDANCE_BACKGROUND_JOBS off). Not for
+    exports, whose file would only exist on this process's disk.
+    """
+    clean, run = KINDS[kind]
+    return run(Job(owner=owner, kind=kind, params=params))
+
+
+def claim_next():
+    """
+    Mark the oldest queued job as running and return its id, or None.
+
+    The claim is a conditional UPDATE, so concurrent workers never pick the
+    same job and no row locks are needed (it works the same on SQLite).
+    """
+    queued = Job.objects.filter(status='Queued').order_by('created_at', 'id').values_list('id', flat=True)
+    for job_id in queued[:20]:
+        if Job.objects.filter(pk=job_id, status='Queued').update(status='Running', started_at=timezone.now()):
+            return job_id
+    return None
+
+
+def fail(job_id, error):
+    Job.objects.filter(pk=job_id).update(status='Failed', error=error, finished_at=timezone.now())
+
+
+def run_job(job_id):
+    """Run a claimed job and record the outcome; runs in a worker process"""
+    try:
+        job = Job.objects.select_related('owner').get(pk=job_id)
+        clean, run = KINDS[job.kind]
+        try:
+            job.message = run(job)[:255]
+        except Exception:
+            fail(job_id, traceback.format_exc())
+            return 'Failed'
+        job.status = 'Done'
+        job.finished_at = timezone.now()
+        job.save(update_fields=['status', 'message', 'result_file', 'finished_at'])
+        return 'Done'
+    finally:
+        connections.close_all()
+
+
+def requeue_running():
+    """Put jobs left running by a worker that was killed back in the queue; returns how many"""
+    return Job.objects.filter(status='Running').update(status='Queued', started_at=None)
+
+
+def delete_file(job):
+    """Remove a job's export file and the exports/<owner>/<job> directories once empty"""
+    if not job.result_file:
+        return
+    storage, name = job.result_file.storage, job.result_file.name
+    storage.delete(name)
+    job_dir = os.path.dirname(name)
+    for directory in (job_dir, os.path.dirname(job_dir)):
+        try:
+            os.rmdir(storage.path(directory))
+        except OSError:
+            # Not empty, or already gone
+            break
+
+
+def expire_files():
+    """Delete export files of jobs finished more than ATTENDANCE_JOB_FILE_DAYS ago; returns how many"""
+    cutoff = timezone.now() - timedelta(days=settings.ATTENDANCE_JOB_FILE_DAYS)
+    expired = list(Job.objects.filter(finished_at__lt=cutoff).exclude(result_file=''))
+    for job in expired:
+        delete_file(job)
+    Job.objects.filter(pk__in=[job.pk for job in expired]).update(result_file='', message='Export file expired.')
+    return len(expired)
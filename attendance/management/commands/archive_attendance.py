@@ -0,0 +1,66 @@
+from datetime import datetime
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from attendance.archive import BATCH_SIZE, archive_cutoff, archive_owner, restore_owner
+from attendance.summaries import month_start, owner_ids
+
+
+def _parse_date(value):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise CommandError(f'Invalid date "{value}", expected YYYY-MM-DD')
+
+
+class Command(BaseCommand):
+    help = 'Move attendance older than the hot window into ArchivedAttendance, or move it back'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--months', type=int,
+            help='Months kept hot before the current one (default: ATTENDANCE_HOT_MONTHS)',
+        )
+        parser.add_argument('--before', help='Archive whole months before this day (YYYY-MM-DD) instead')
+        parser.add_argument('--owner', help='Only process employees of this username')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help='Employees moved per transaction')
+        parser.add_argument(
+            '--restore', action='store_true',
+            help='Move archived months from the cutoff on back into Attendance, e.g. after raising --months',
+        )
+
+    def handle(self, *args, **options):
+        if options['before']:
+            before = _parse_date(options['before'])
+            # Only whole months are archived
+            cutoff = month_start(before.year, before.month)
+        else:
+            months = settings.ATTENDANCE_HOT_MONTHS if options['months'] is None else options['months']
+            if months < 0:
+                raise CommandError('--months must not be negative')
+            cutoff = archive_cutoff(timezone.now().date(), months)
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1')
+
+        if options['owner']:
+            try:
+                owners = [User.objects.get(username=options['owner']).id]
+            except User.DoesNotExist:
+                raise CommandError(f'User "{options["owner"]}" does not exist')
+        else:
+            owners = owner_ids()
+
+        if options['restore']:
+            for owner_id in owners:
+                moved = restore_owner(owner_id, cutoff, batch_size=options['batch_size'])
+                self.stdout.write(f'owner {owner_id}: {moved} days restored')
+            self.stdout.write(self.style.SUCCESS(f'Archived attendance from {cutoff} on restored for {len(owners)} owners.'))
+            return
+
+        for owner_id in owners:
+            moved = archive_owner(owner_id, cutoff, options['batch_size'])
+            self.stdout.write(f'owner {owner_id}: {moved} days archived')
+        self.stdout.write(self.style.SUCCESS(f'Attendance before {cutoff} archived for {len(owners)} owners.'))
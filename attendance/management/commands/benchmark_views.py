@@ -0,0 +1,71 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import setup_test_environment
+
+from attendance.benchmarking import VIEWS, compare, parse_size, run
+
+
+class Command(BaseCommand):
+    help = 'Time the main views through the test client at several data sizes and report JSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes', nargs='+', default=['50x30', '500x90'], metavar='EMPLOYEESxDAYS',
+            help='Data sizes; each gets its own seeded bench-<size> owner',
+        )
+        parser.add_argument('--views', nargs='+', choices=VIEWS, default=VIEWS, help='Views to time')
+        parser.add_argument('--repeat', type=int, default=20, help='Timed requests per view, after one warm-up request')
+        parser.add_argument('--cold', action='store_true', help='Invalidate the owner\'s cached reports before every request')
+        parser.add_argument('--reseed', action='store_true', help='Regenerate the benchmark owners\' data first')
+        parser.add_argument('--label', default='', help='Name of this run, e.g. a git revision')
+        parser.add_argument('--output', metavar='PATH', help='Write the JSON report here instead of stdout')
+        parser.add_argument('--baseline', metavar='PATH', help='Earlier JSON report to check for regressions')
+        parser.add_argument(
+            '--tolerance', type=float, default=1.25,
+            help='Allowed p50 slowdown against --baseline, as a factor (query counts must not grow)',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            sizes = [parse_size(size) for size in options['sizes']]
+        except ValueError:
+            raise CommandError('--sizes takes EMPLOYEESxDAYS values such as 500x90')
+        if options['repeat'] < 1:
+            raise CommandError('--repeat must be at least 1')
+        baseline = None
+        if options['baseline']:
+            try:
+                with open(options['baseline']) as f:
+                    baseline = json.load(f)
+            except (OSError, ValueError) as e:
+                raise CommandError(f'Cannot read baseline {options["baseline"]}: {e}')
+
+        # Lets the test client's 'testserver' host through ALLOWED_HOSTS
+        setup_test_environment()
+
+        def progress(result):
+            latency = result['latency_ms']
+            self.stderr.write(
+                f'{result["size"]:>10} {result["view"]:<18} p50 {latency["p50"]:>8.1f}ms  p90 {latency["p90"]:>8.1f}ms  '
+                f'{result["queries"]:>3} queries  {result["peak_memory_kib"]:>7} KiB'
+            )
+
+        report = run(
+            sizes, options['views'], options['repeat'], options['cold'], options['reseed'], options['label'], progress,
+        )
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output + '\n')
+            self.stderr.write(self.style.SUCCESS(f'Report written to {options["output"]}'))
+        else:
+            self.stdout.write(output)
+
+        if baseline is not None:
+            regressions = compare(report, baseline, options['tolerance'])
+            for size, view, metric, then, now in regressions:
+                self.stderr.write(self.style.WARNING(f'{size} {view}: {metric} {then} -> {now}'))
+            if regressions:
+                raise CommandError(f'{len(regressions)} regressions against {options["baseline"]}')
+            self.stderr.write(self.style.SUCCESS(f'No regressions against {options["baseline"]}.'))
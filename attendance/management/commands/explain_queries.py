@@ -0,0 +1,58 @@
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from attendance.models import Attendance, Employee, MonthlyAttendanceSummary
+from attendance.summaries import month_start, next_month_start
+
+
+# Plan fragments that mean the attendance table is read without an index
+FULL_SCAN_MARKERS = {
+    'sqlite': ['SCAN attendance_attendance'],
+    'postgresql': ['Seq Scan on attendance_attendance'],
+}
+
+
+def hot_queries(owner, employee, day):
+    start, end = month_start(day.year, day.month), next_month_start(day.year, day.month)
+    return [
+        ('mark_attendance day lookup', Attendance.objects.filter(owner=owner, date=day)),
+        ('employee_detail month', Attendance.objects.filter(employee=employee, date__gte=start, date__lt=end).order_by('date')),
+        ('range export', Attendance.objects.filter(owner=owner, date__gte=start - timedelta(days=365), date__lt=end)),
+        ('daily status count', Attendance.objects.filter(date__gte=start, date__lt=end, status='Absent')),
+        ('monthly report', MonthlyAttendanceSummary.objects.filter(owner=owner, year=day.year, month=day.month)),
+        ('roster', Employee.objects.filter(owner=owner).order_by('name')),
+    ]
+
+
+class Command(BaseCommand):
+    help = 'Print EXPLAIN plans for the hot attendance queries and flag full table scans'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--owner', help='Username whose data the queries are scoped to')
+
+    def handle(self, *args, **options):
+        owners = User.objects.filter(employees__isnull=False)
+        if options['owner']:
+            owners = owners.filter(username=options['owner'])
+        owner = owners.first()
+        employee = owner and owner.employees.first()
+        if employee is None:
+            raise CommandError('No owner with employees found, seed some data first')
+
+        markers = FULL_SCAN_MARKERS.get(connection.vendor, [])
+        full_scans = 0
+        for label, queryset in hot_queries(owner, employee, timezone.now().date()):
+            plan = queryset.explain()
+            self.stdout.write(self.style.MIGRATE_HEADING(label))
+            self.stdout.write(plan)
+            if any(marker in plan for marker in markers):
+                full_scans += 1
+                self.stdout.write(self.style.WARNING('  -> full scan of attendance_attendance'))
+
+        if full_scans:
+            raise CommandError(f'{full_scans} queries scan the whole attendance table')
+        self.stdout.write(self.style.SUCCESS('All hot queries use an index.'))
@@ -0,0 +1,36 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from attendance.imports import KINDS, import_csv
+
+
+class Command(BaseCommand):
+    help = 'Import employees or historical attendance for one owner from a CSV file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV file to import')
+        parser.add_argument('--owner', required=True, help='Username the rows belong to')
+        parser.add_argument('--kind', choices=KINDS, default='attendance',
+                            help='employees (name,emp_id,role,salary) or attendance (emp_id,date,status)')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows validated and written per batch')
+
+    def handle(self, *args, **options):
+        try:
+            owner = User.objects.get(username=options['owner'])
+        except User.DoesNotExist:
+            raise CommandError(f'User "{options["owner"]}" does not exist')
+
+        def progress(report):
+            self.stdout.write(f'{report.processed} rows processed, {report.saved} saved, {report.error_count} errors')
+
+        try:
+            with open(options['path'], newline='', encoding='utf-8-sig') as csv_file:
+                report = import_csv(owner, csv_file, options['kind'], max(1, options['batch_size']), progress)
+        except (OSError, ValueError) as e:
+            raise CommandError(str(e))
+
+        for error in report.errors:
+            self.stdout.write(self.style.WARNING(error))
+        if report.error_count > len(report.errors):
+            self.stdout.write(self.style.WARNING(f'... and {report.error_count - len(report.errors)} more errors'))
+        self.stdout.write(self.style.SUCCESS(f'Imported {report.saved} of {report.processed} rows.'))
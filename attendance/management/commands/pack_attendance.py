@@ -0,0 +1,63 @@
+from datetime import datetime
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Min
+from django.utils import timezone
+
+from attendance.models import Attendance
+from attendance.packing import pack_owner, verify_owner
+from attendance.summaries import owner_ids
+
+
+def _parse_date(value):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise CommandError(f'Invalid date "{value}", expected YYYY-MM-DD')
+
+
+class Command(BaseCommand):
+    help = 'Build or verify packed monthly attendance (two bits per day) from the Attendance table'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', help='First day of the range (YYYY-MM-DD), defaults to the oldest record')
+        parser.add_argument('--end', help='Last day of the range (YYYY-MM-DD), defaults to today')
+        parser.add_argument('--owner', help='Only process employees of this username')
+        parser.add_argument('--verify', action='store_true', help='Report out-of-date months instead of repacking')
+
+    def handle(self, *args, **options):
+        today = timezone.now().date()
+        oldest = Attendance.objects.aggregate(oldest=Min('date'))['oldest'] or today
+        start = _parse_date(options['start']) if options['start'] else oldest
+        end = _parse_date(options['end']) if options['end'] else today
+        if start > end:
+            raise CommandError('--start must not be after --end')
+
+        if options['owner']:
+            try:
+                owners = [User.objects.get(username=options['owner']).id]
+            except User.DoesNotExist:
+                raise CommandError(f'User "{options["owner"]}" does not exist')
+        else:
+            owners = owner_ids()
+
+        if options['verify']:
+            mismatches = 0
+            for owner_id in owners:
+                for line in verify_owner(owner_id, start, end):
+                    mismatches += 1
+                    self.stdout.write(self.style.WARNING(f'owner {owner_id}: {line}'))
+            if mismatches:
+                raise CommandError(f'{mismatches} packed months out of date, run without --verify to repack them')
+            self.stdout.write(self.style.SUCCESS(f'Packed months for {start} to {end} are up to date.'))
+            return
+
+        for owner_id in owners:
+            self.stdout.write(f'owner {owner_id}: {pack_owner(owner_id, start, end)} months packed')
+        self.stdout.write(self.style.SUCCESS(f'Attendance for {start} to {end} packed for {len(owners)} owners.'))
+        if settings.ATTENDANCE_STORAGE != 'packed':
+            self.stdout.write(self.style.WARNING(
+                "ATTENDANCE_STORAGE is not 'packed', so new writes will not update the packed months."
+            ))
@@ -1,22 +1,72 @@
-from django.core.management.base import BaseCommand
-from attendance.models import Attendance, Employee
+from datetime import datetime
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from attendance.purging import BATCH_SIZE, Archive, purge
+
+
+def _parse_date(value):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise CommandError(f'Invalid date "{value}", expected YYYY-MM-DD')
 
 
 class Command(BaseCommand):
-    help = 'Delete all employees and their attendance records'
+    help = 'Delete employees and their attendance records, or only attendance before a date, in small chunks'
 
     def add_arguments(self, parser):
         parser.add_argument('--yes', action='store_true', help='Confirm deletion without prompt')
+        parser.add_argument('--owner', help='Only delete employees and attendance of this username')
+        parser.add_argument('--before', help='Only delete attendance dated before this day (YYYY-MM-DD), keeping employees')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help='Rows deleted per transaction')
+        parser.add_argument('--workers', type=int, default=1, help='Number of PK ranges deleted in parallel')
+        parser.add_argument(
+            '--archive', metavar='PATH',
+            help='Write deleted rows to this new .jsonl.gz file first; restore it with loaddata',
+        )
 
     def handle(self, *args, **options):
+        before = _parse_date(options['before']) if options['before'] else None
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1')
+        if options['workers'] < 1:
+            raise CommandError('--workers must be at least 1')
+        if options['archive'] and not options['archive'].endswith('.jsonl.gz'):
+            raise CommandError('--archive must end in .jsonl.gz so loaddata can restore it')
+
+        owner_id = None
+        if options['owner']:
+            try:
+                owner_id = User.objects.get(username=options['owner']).id
+            except User.DoesNotExist:
+                raise CommandError(f'User "{options["owner"]}" does not exist')
+
+        scope = f'of {options["owner"]}' if options['owner'] else ''
+        if before:
+            target = f'ALL attendance {scope} dated before {before}'
+        else:
+            target = f'ALL employees and attendance {scope}'
+        target = ' '.join(target.split())
+
         confirm = options['yes']
         if not confirm:
-            self.stdout.write(self.style.WARNING('This will delete ALL employees and attendance.'))
+            self.stdout.write(self.style.WARNING(f'This will delete {target}.'))
             self.stdout.write(self.style.WARNING('Run with --yes to confirm.'))
             return
 
-        Attendance.objects.all().delete()
-        Employee.objects.all().delete()
-        self.stdout.write(self.style.SUCCESS('All employees and attendance records have been deleted.'))
-
+        params = {'owner_id': owner_id, 'before': before, 'batch_size': options['batch_size'], 'workers': options['workers']}
+        if options['archive']:
+            try:
+                archive = Archive(options['archive'])
+            except FileExistsError:
+                raise CommandError(f'{options["archive"]} already exists')
+            with archive:
+                deleted = purge(archive=archive, **params)
+            self.stdout.write(f'Deleted rows archived to {options["archive"]}')
+        else:
+            deleted = purge(**params)
 
+        counts = ', '.join(f'{count} {name}' for name, count in deleted.items())
+        self.stdout.write(self.style.SUCCESS(f'Deleted {target} ({counts}).'))
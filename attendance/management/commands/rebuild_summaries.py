@@ -0,0 +1,67 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.utils import timezone
+
+from attendance.summaries import owner_ids, rebuild_owner, verify_owner
+
+
+def _parse_date(value):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise CommandError(f'Invalid date "{value}", expected YYYY-MM-DD')
+
+
+class Command(BaseCommand):
+    help = 'Rebuild or verify monthly attendance summaries for a date range'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', help='First day of the range (YYYY-MM-DD), defaults to this month')
+        parser.add_argument('--end', help='Last day of the range (YYYY-MM-DD), defaults to today')
+        parser.add_argument('--owner', help='Only process employees of this username')
+        parser.add_argument('--verify', action='store_true', help='Report mismatches instead of rewriting summaries')
+        parser.add_argument('--workers', type=int, default=1, help='Number of owners processed in parallel')
+
+    def handle(self, *args, **options):
+        today = timezone.now().date()
+        start = _parse_date(options['start']) if options['start'] else today.replace(day=1)
+        end = _parse_date(options['end']) if options['end'] else today
+        if start > end:
+            raise CommandError('--start must not be after --end')
+
+        if options['owner']:
+            try:
+                owners = [User.objects.get(username=options['owner']).id]
+            except User.DoesNotExist:
+                raise CommandError(f'User "{options["owner"]}" does not exist')
+        else:
+            owners = owner_ids()
+
+        task = verify_owner if options['verify'] else rebuild_owner
+
+        def run(owner_id):
+            try:
+                return owner_id, task(owner_id, start, end)
+            finally:
+                connections.close_all()
+
+        mismatches = 0
+        with ThreadPoolExecutor(max_workers=max(1, options['workers'])) as pool:
+            for owner_id, result in pool.map(run, owners):
+                if options['verify']:
+                    mismatches += len(result)
+                    for line in result:
+                        self.stdout.write(self.style.WARNING(f'owner {owner_id}: {line}'))
+                else:
+                    self.stdout.write(f'owner {owner_id}: {result} summaries rebuilt')
+
+        if options['verify']:
+            if mismatches:
+                raise CommandError(f'{mismatches} summaries out of date, run without --verify to rebuild them')
+            self.stdout.write(self.style.SUCCESS(f'Summaries for {start} to {end} are up to date.'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'Summaries for {start} to {end} rebuilt for {len(owners)} owners.'))
@@ -0,0 +1,75 @@
+import multiprocessing
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from attendance.jobs import claim_next, expire_files, fail, requeue_running, run_job
+
+
+# Seconds between sweeps for export files past ATTENDANCE_JOB_FILE_DAYS
+EXPIRY_INTERVAL = 3600
+
+
+class Command(BaseCommand):
+    help = 'Run queued background jobs (exports, summary recalculations) on a process pool'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=2, help='Number of jobs run in parallel')
+        parser.add_argument('--poll', type=float, default=2.0, help='Seconds between checks for new jobs')
+        parser.add_argument('--once', action='store_true', help='Exit once the queue is empty')
+        parser.add_argument(
+            '--requeue-running', action='store_true',
+            help='Requeue jobs left running by a killed worker; only safe when no other worker is running',
+        )
+
+    def handle(self, *args, **options):
+        workers = options['workers']
+        if workers < 1:
+            raise CommandError('--workers must be at least 1')
+
+        if options['requeue_running']:
+            self.stdout.write(f'{requeue_running()} running jobs requeued')
+
+        # Spawned children import Django afresh instead of sharing the parent's DB connections
+        context = multiprocessing.get_context('spawn')
+        running = {}
+        next_expiry = time.monotonic()
+        self.stdout.write(f'Worker started with {workers} processes')
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=django.setup) as pool:
+            try:
+                while True:
+                    if time.monotonic() >= next_expiry:
+                        expired = expire_files()
+                        if expired:
+                            self.stdout.write(f'{expired} expired export files deleted')
+                        next_expiry = time.monotonic() + EXPIRY_INTERVAL
+
+                    while len(running) < workers:
+                        job_id = claim_next()
+                        if job_id is None:
+                            break
+                        running[pool.submit(run_job, job_id)] = job_id
+                        self.stdout.write(f'job {job_id}: started')
+
+                    if not running:
+                        if options['once']:
+                            break
+                        connections.close_all()
+                        time.sleep(options['poll'])
+                        continue
+
+                    done, pending = wait(running, timeout=options['poll'], return_when=FIRST_COMPLETED)
+                    for future in done:
+                        job_id = running.pop(future)
+                        try:
+                            self.stdout.write(f'job {job_id}: {future.result()}')
+                        except Exception as e:
+                            # The child died before it could record the outcome
+                            fail(job_id, f'Worker process failed: {e!r}')
+                            self.stdout.write(self.style.ERROR(f'job {job_id}: worker process failed: {e!r}'))
+            except KeyboardInterrupt:
+                self.stdout.write(f'Stopping, waiting for {len(running)} running jobs')
+        self.stdout.write(self.style.SUCCESS('Worker stopped.'))
@@ -0,0 +1,58 @@
+import random
+import time
+from datetime import datetime
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from attendance.seeding import BATCH_SIZE, create_owners, remove_owner, seed_owner
+
+
+def _parse_date(value):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        raise CommandError(f'Invalid date "{value}", expected YYYY-MM-DD')
+
+
+class Command(BaseCommand):
+    help = 'Generate owners x employees x days of synthetic attendance with bulk inserts'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--owners', type=int, default=1, help='Number of owner accounts')
+        parser.add_argument('--employees', type=int, default=50, help='Employees per owner')
+        parser.add_argument('--days', type=int, default=90, help='Days of attendance per employee')
+        parser.add_argument('--end', help='Last day of attendance (YYYY-MM-DD), defaults to today')
+        parser.add_argument('--prefix', default='seed', help='Owners are named <prefix>1, <prefix>2, ...')
+        parser.add_argument('--password', default='seed-password', help='Password of every generated owner')
+        parser.add_argument('--random-seed', type=int, default=0, help='Seed for reproducible data')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help='Rows per bulk insert')
+        parser.add_argument('--replace', action='store_true', help='Delete existing owners with the same names first')
+
+    def handle(self, *args, **options):
+        for option in ('owners', 'employees', 'days', 'batch_size'):
+            if options[option] < 1:
+                raise CommandError(f'--{option.replace("_", "-")} must be at least 1')
+        end = _parse_date(options['end']) if options['end'] else timezone.now().date()
+
+        usernames = [f'{options["prefix"]}{index}' for index in range(1, options['owners'] + 1)]
+        existing = list(User.objects.filter(username__in=usernames))
+        if existing and not options['replace']:
+            raise CommandError(f'{len(existing)} of these owners already exist, use --replace or another --prefix')
+        for owner in existing:
+            remove_owner(owner)
+            self.stdout.write(f'{owner.username}: removed')
+
+        rng = random.Random(options['random_seed'])
+        started = time.perf_counter()
+        total = 0
+        for owner in create_owners(usernames, options['password']):
+            written = seed_owner(owner, options['employees'], options['days'], end, rng, options['batch_size'])
+            total += written
+            self.stdout.write(f'{owner.username}: {options["employees"]} employees, {written} attendance rows')
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Seeded {len(usernames)} owners with {total} attendance rows in {elapsed:.1f}s ({total / elapsed:.0f} rows/s).'
+        ))
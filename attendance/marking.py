@@ -0,0 +1,125 @@
+import csv
+import io
+from datetime import date, datetime
+
+from django.db import connection, transaction
+
+from .models import ArchivedAttendance, Attendance, Employee, MonthlyAttendanceSummary, OwnerDataVersion
+
+
+VALID_STATUSES = {choice[0] for choice in Attendance.STATUS_CHOICES}
+BATCH_SIZE = 1000
+
+
+def parse_day(value):
+    """Accept a date or a YYYY-MM-DD string; raises ValueError otherwise"""
+    if isinstance(value, date):
+        return value
+    return datetime.strptime(str(value), '%Y-%m-%d').date()
+
+
+def validate_records(owner, records):
+    """
+    Check attendance records against the owner's employees and the status choices.
+
+    ``records`` is a list of dicts with ``employee_id``, ``date`` and ``status``.
+    Returns ``(rows, errors)``: ``rows`` maps ``(employee_id, date)`` to the
+    status to store (the last record for the same employee and day wins) and
+    ``errors`` is a list of ``(index, employee_id, message)`` tuples.
+    """
+    owned_ids = set(
+        Employee.objects.filter(owner=owner, id__in={record.get('employee_id') for record in records})
+        .values_list('id', flat=True)
+    )
+
+    errors = []
+    rows = {}
+    for index, record in enumerate(records):
+        employee_id = record.get('employee_id')
+        status = record.get('status')
+        if employee_id not in owned_ids:
+            errors.append((index, employee_id, 'Unknown employee.'))
+            continue
+        if status not in VALID_STATUSES:
+            errors.append((index, employee_id, f'Invalid status "{status}".'))
+            continue
+        try:
+            day = parse_day(record.get('date'))
+        except (TypeError, ValueError):
+            errors.append((index, employee_id, f'Invalid date "{record.get("date")}".'))
+            continue
+        rows[(employee_id, day)] = status
+    return rows, errors
+
+
+def _copy_rows(owner, rows):
+    """Load rows through COPY into a temp table, then upsert them in one statement (Postgres)"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for (employee_id, day), status in rows.items():
+        writer.writerow([employee_id, owner.id, day.isoformat(), status])
+    buffer.seek(0)
+
+    table = Attendance._meta.db_table
+    with connection.cursor() as cursor:
+        # Dropped at commit, but an enclosing transaction may already hold one. Qualified with
+        # pg_temp, so a missing temp table never resolves to a real table of that name.
+        cursor.execute('DROP TABLE IF EXISTS pg_temp.attendance_import')
+        cursor.execute(
+            'CREATE TEMP TABLE attendance_import '
+            '(employee_id bigint, owner_id integer, date date, status varchar(10)) ON COMMIT DROP'
+        )
+        cursor.copy_expert('COPY pg_temp.attendance_import FROM STDIN WITH (FORMAT csv)', buffer)
+        cursor.execute(
+            f'INSERT INTO {table} (employee_id, owner_id, date, status, created_at, updated_at) '
+            'SELECT employee_id, owner_id, date, status, now(), now() FROM pg_temp.attendance_import '
+            'ON CONFLICT (employee_id, date) DO UPDATE SET '
+            'owner_id = EXCLUDED.owner_id, status = EXCLUDED.status, updated_at = EXCLUDED.updated_at'
+        )
+
+
+def write_rows(owner, rows, use_copy=False):
+    """
+    Upsert validated rows and refresh the touched monthly summaries in one transaction.
+
+    Rows go out with INSERT ... ON CONFLICT per batch, or through COPY when
+    ``use_copy`` is set and the database is Postgres.
+    """
+    if not rows:
+        return
+    months = {}
+    for employee_id, day in rows:
+        months.setdefault((day.year, day.month), set()).add(employee_id)
+
+    with transaction.atomic():
+        for (year, month), employee_ids in months.items():
+            ArchivedAttendance.restore(employee_ids, year, month)
+        if use_copy and connection.vendor == 'postgresql':
+            _copy_rows(owner, rows)
+        else:
+            Attendance.objects.bulk_create(
+                [
+                    Attendance(employee_id=employee_id, owner_id=owner.id, date=day, status=status)
+                    for (employee_id, day), status in rows.items()
+                ],
+                batch_size=BATCH_SIZE,
+                update_conflicts=True,
+                unique_fields=['employee', 'date'],
+                update_fields=['owner', 'status', 'updated_at'],
+            )
+        for (year, month), employee_ids in months.items():
+            MonthlyAttendanceSummary.refresh(employee_ids, year, month)
+        OwnerDataVersion.bump(owner.id)
+
+
+def upsert_attendance(owner, records):
+    """
+    Validate and save many attendance records in one transaction.
+
+    Invalid records are skipped and reported; everything else is written by
+    write_rows(). Returns ``(saved, errors)`` where ``errors`` is a list of
+    ``(index, employee_id, message)`` tuples.
+    """
+    rows, errors = validate_records(owner, list(records))
+    write_rows(owner, rows)
+    return len(rows), errors
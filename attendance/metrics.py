@@ -0,0 +1,217 @@
+import bisect
+import contextvars
+import cProfile
+import functools
+import itertools
+import logging
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.template.backends.django import DjangoTemplates
+
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds of the histogram buckets; every series keeps one counter per bucket
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+HISTOGRAMS = {
+    'attendance_request_duration_seconds': ('Time until the view returned a response', SECONDS_BUCKETS),
+    'attendance_request_queries': ('SQL queries run per request', QUERY_BUCKETS),
+    'attendance_request_sql_seconds': ('Time spent in SQL per request', SECONDS_BUCKETS),
+    'attendance_request_template_seconds': ('Time spent rendering templates per request', SECONDS_BUCKETS),
+}
+SLOW_QUERIES = 'attendance_slow_queries_total'
+# Requests outside attendance/urls.py (admin, 404s) share one label, which keeps the series bounded
+OTHER_VIEW = 'other'
+
+_request = contextvars.ContextVar('attendance_request_stats', default=None)
+_profiling = threading.Lock()
+_profile_numbers = itertools.count(1)
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus layout, safe to update from several threads"""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            self.counts[index] += 1
+            self.sum += value
+
+    def snapshot(self):
+        with self.lock:
+            return list(self.counts), self.sum
+
+
+class Registry:
+    """Per-view histograms and slow-query counters of this process"""
+
+    def __init__(self):
+        self.histograms = {}
+        self.slow_queries = {}
+        self.lock = threading.Lock()
+
+    def histogram(self, name, view):
+        key = (name, view)
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            with self.lock:
+                histogram = self.histograms.setdefault(key, Histogram(HISTOGRAMS[name][1]))
+        return histogram
+
+    def count_slow_query(self, view):
+        with self.lock:
+            self.slow_queries[view] = self.slow_queries.get(view, 0) + 1
+
+    def render(self):
+        """All series in the Prometheus text exposition format"""
+        lines = []
+        for name, (help_text, buckets) in HISTOGRAMS.items():
+            lines += [f'# HELP {name} {help_text}', f'# TYPE {name} histogram']
+            views = sorted(view for metric, view in self.histograms if metric == name)
+            for view in views:
+                counts, total = self.histograms[name, view].snapshot()
+                cumulative = 0
+                for bound, count in zip([*buckets, '+Inf'], counts):
+                    cumulative += count
+                    lines.append(f'{name}_bucket{{view="{view}",le="{bound}"}} {cumulative}')
+                lines.append(f'{name}_sum{{view="{view}"}} {total:.6f}')
+                lines.append(f'{name}_count{{view="{view}"}} {cumulative}')
+        lines += [f'# HELP {SLOW_QUERIES} Queries slower than ATTENDANCE_SLOW_QUERY_MS', f'# TYPE {SLOW_QUERIES} counter']
+        with self.lock:
+            slow = sorted(self.slow_queries.items())
+        lines += [f'{SLOW_QUERIES}{{view="{view}"}} {count}' for view, count in slow]
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+
+class RequestStats:
+    def __init__(self, request):
+        self.request = request
+        self.queries = 0
+        self.sql = 0.0
+        self.templates = 0.0
+
+
+@functools.cache
+def view_names():
+    from . import urls
+    return {pattern.name for pattern in urls.urlpatterns}
+
+
+def view_label(request):
+    match = request.resolver_match
+    if match is None or match.url_name not in view_names():
+        return OTHER_VIEW
+    return match.url_name
+
+
+@contextmanager
+def track(request):
+    """Collect the queries and template time of the request running inside the block, then record them"""
+    stats = RequestStats(request)
+    token = _request.set(stats)
+    started = time.perf_counter()
+    try:
+        yield stats
+    finally:
+        elapsed = time.perf_counter() - started
+        _request.reset(token)
+        view = view_label(request)
+        registry.histogram('attendance_request_duration_seconds', view).observe(elapsed)
+        registry.histogram('attendance_request_queries', view).observe(stats.queries)
+        registry.histogram('attendance_request_sql_seconds', view).observe(stats.sql)
+        registry.histogram('attendance_request_template_seconds', view).observe(stats.templates)
+
+
+def record_query(execute, sql, params, many, context):
+    """Database execute wrapper: times every query of a tracked request and logs slow ones"""
+    stats = _request.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed = time.perf_counter() - started
+        stats.queries += 1
+        stats.sql += elapsed
+        if elapsed * 1000 >= settings.ATTENDANCE_SLOW_QUERY_MS:
+            view = view_label(stats.request)
+            registry.count_slow_query(view)
+            logger.warning('Slow query (%.0f ms) in %s: %s', elapsed * 1000, view, sql)
+
+
+def install_query_wrapper(sender, connection, **kwargs):
+    """connection_created handler; the wrapper list outlives reconnects, so add it once"""
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+class TimedTemplate:
+    def __init__(self, template):
+        self.template = template
+
+    def __getattr__(self, name):
+        return getattr(self.template, name)
+
+    def render(self, context=None, request=None):
+        stats = _request.get()
+        if stats is None:
+            return self.template.render(context, request)
+        started = time.perf_counter()
+        try:
+            return self.template.render(context, request)
+        finally:
+            stats.templates += time.perf_counter() - started
+
+
+class InstrumentedDjangoTemplates(DjangoTemplates):
+    """The Django template backend, timing each top-level render for the request metrics"""
+
+    def from_string(self, template_code):
+        return TimedTemplate(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name))
+
+
+@contextmanager
+def maybe_profile(request):
+    """
+    Run the block under cProfile for a sample of requests when ATTENDANCE_PROFILE_DIR is set.
+
+    Profiles are written as <view>-<time>-<pid>-<n>.prof, readable with pstats
+    or snakeviz. Only one request is profiled at a time per process, and only
+    the calling thread is profiled: under ASGI, sync views and ORM calls run
+    in worker threads and show up as time spent awaiting.
+    """
+    directory = settings.ATTENDANCE_PROFILE_DIR
+    if not directory or random.random() >= settings.ATTENDANCE_PROFILE_SAMPLE or not _profiling.acquire(blocking=False):
+        yield
+        return
+    profile = cProfile.Profile()
+    try:
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+        os.makedirs(directory, exist_ok=True)
+        name = f'{view_label(request)}-{time.strftime("%Y%m%dT%H%M%S")}-{os.getpid()}-{next(_profile_numbers)}.prof'
+        profile.dump_stats(os.path.join(directory, name))
+    finally:
+        _profiling.release()
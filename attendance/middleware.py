@@ -0,0 +1,92 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.urls import Resolver404, resolve
+
+from . import routers
+from .metrics import maybe_profile, track
+
+
+class MetricsMiddleware:
+    """
+    Record latency, SQL queries, SQL time and template time per URL name.
+
+    Streaming responses are timed until the view returns, not until the body
+    has been sent. Runs natively under both WSGI and ASGI.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with track(request), maybe_profile(request):
+            return self.get_response(request)
+
+    async def __acall__(self, request):
+        with track(request), maybe_profile(request):
+            return await self.get_response(request)
+
+
+class ReplicaMiddleware:
+    """
+    Let the views in ATTENDANCE_REPLICA_VIEWS read attendance data from a replica.
+
+    A request that writes sets a short-lived cookie, and requests carrying it
+    read from the primary, so users see their own changes on the next pages.
+    Disabled unless DATABASE_REPLICAS is set. Keep it after SessionMiddleware,
+    so saving the session does not count as a write.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.DATABASE_REPLICAS:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def use_replica(self, request):
+        if request.method not in ('GET', 'HEAD') or routers.PRIMARY_COOKIE in request.COOKIES:
+            return False
+        try:
+            return resolve(request.path_info).url_name in settings.ATTENDANCE_REPLICA_VIEWS
+        except Resolver404:
+            return False
+
+    def finish(self, response, routing):
+        if routing.wrote:
+            response.set_cookie(
+                routers.PRIMARY_COOKIE, '1', max_age=settings.ATTENDANCE_PRIMARY_PIN_SECONDS,
+                httponly=True, samesite='Lax',
+            )
+        if response.streaming:
+            iterate = routers.aiterate if response.is_async else routers.iterate
+            response.streaming_content = iterate(response.streaming_content, routing)
+        return response
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = routers.start_request(self.use_replica(request))
+        try:
+            response = self.get_response(request)
+            return self.finish(response, routers.current())
+        finally:
+            routers.end_request(token)
+
+    async def __acall__(self, request):
+        token = routers.start_request(self.use_replica(request))
+        try:
+            response = await self.get_response(request)
+            return self.finish(response, routers.current())
+        finally:
+            routers.end_request(token)
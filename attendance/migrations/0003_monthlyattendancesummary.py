@@ -0,0 +1,70 @@
+# Generated by Django 5.2.5 on 2026-10-18 16:34
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Q
+from django.db.models.functions import ExtractMonth, ExtractYear
+
+
+def backfill_summaries(apps, schema_editor):
+    Attendance = apps.get_model('attendance', 'Attendance')
+    MonthlyAttendanceSummary = apps.get_model('attendance', 'MonthlyAttendanceSummary')
+    rows = (
+        Attendance.objects.annotate(year=ExtractYear('date'), month=ExtractMonth('date'))
+        .order_by()
+        .values('employee_id', 'employee__owner_id', 'year', 'month')
+        .annotate(
+            present=Count('id', filter=Q(status='Present')),
+            absent=Count('id', filter=Q(status='Absent')),
+            leave=Count('id', filter=Q(status='Leave')),
+            holiday=Count('id', filter=Q(status='Holiday')),
+        )
+    )
+    MonthlyAttendanceSummary.objects.bulk_create(
+        [
+            MonthlyAttendanceSummary(
+                employee_id=row['employee_id'],
+                owner_id=row['employee__owner_id'],
+                year=row['year'],
+                month=row['month'],
+                present=row['present'],
+                absent=row['absent'],
+                leave=row['leave'],
+                holiday=row['holiday'],
+            )
+            for row in rows.iterator()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0002_employee_owner'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MonthlyAttendanceSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.PositiveSmallIntegerField()),
+                ('month', models.PositiveSmallIntegerField()),
+                ('present', models.PositiveIntegerField(default=0)),
+                ('absent', models.PositiveIntegerField(default=0)),
+                ('leave', models.PositiveIntegerField(default=0)),
+                ('holiday', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('employee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='monthly_summaries', to='attendance.employee')),
+                ('owner', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='monthly_summaries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-year', '-month', 'employee'],
+                'unique_together': {('employee', 'year', 'month')},
+            },
+        ),
+        migrations.RunPython(backfill_summaries, migrations.RunPython.noop),
+    ]
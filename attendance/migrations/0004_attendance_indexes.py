@@ -0,0 +1,31 @@
+# Generated by Django 5.2.5 on 2026-10-18 16:36
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0003_monthlyattendancesummary'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='attendance',
+            options={'ordering': ['-date', 'employee_id']},
+        ),
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(fields=['date', 'status'], name='attendance_date_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='employee',
+            index=models.Index(fields=['owner', 'name'], name='employee_owner_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='monthlyattendancesummary',
+            index=models.Index(fields=['owner', 'year', 'month'], name='summary_owner_month_idx'),
+        ),
+    ]
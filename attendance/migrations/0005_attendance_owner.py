@@ -0,0 +1,35 @@
+# Generated by Django 5.2.5 on 2026-10-18 16:37
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def backfill_owner(apps, schema_editor):
+    Attendance = apps.get_model('attendance', 'Attendance')
+    Employee = apps.get_model('attendance', 'Employee')
+    Attendance.objects.update(
+        owner_id=Subquery(Employee.objects.filter(id=OuterRef('employee_id')).values('owner_id')[:1])
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0004_attendance_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='attendance',
+            name='owner',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='attendance_records', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.RunPython(backfill_owner, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='attendance',
+            index=models.Index(fields=['owner', 'date'], name='attendance_owner_date_idx'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.5 on 2026-10-18 16:40
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0006_api_tokens_idempotency'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OwnerDataVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.PositiveBigIntegerField(default=1)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('owner', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='data_version', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+    ]
@@ -0,0 +1,79 @@
+from django.db import DatabaseError, migrations, transaction
+
+
+# Frozen copies of the SQL in attendance.search as of this migration, so later
+# changes to the app code do not change what it runs
+
+# External-content FTS5 table over attendance_employee, kept in sync by triggers
+SQLITE_FTS_CREATE = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS attendance_employee_fts USING fts5("
+    "name, emp_id, content='attendance_employee', content_rowid='id', tokenize='trigram')",
+    "CREATE TRIGGER IF NOT EXISTS attendance_employee_fts_insert AFTER INSERT ON attendance_employee BEGIN "
+    "INSERT INTO attendance_employee_fts(rowid, name, emp_id) VALUES (new.id, new.name, new.emp_id); END",
+    "CREATE TRIGGER IF NOT EXISTS attendance_employee_fts_delete AFTER DELETE ON attendance_employee BEGIN "
+    "INSERT INTO attendance_employee_fts(attendance_employee_fts, rowid, name, emp_id) "
+    "VALUES ('delete', old.id, old.name, old.emp_id); END",
+    "CREATE TRIGGER IF NOT EXISTS attendance_employee_fts_update AFTER UPDATE OF name, emp_id ON attendance_employee BEGIN "
+    "INSERT INTO attendance_employee_fts(attendance_employee_fts, rowid, name, emp_id) "
+    "VALUES ('delete', old.id, old.name, old.emp_id); "
+    "INSERT INTO attendance_employee_fts(rowid, name, emp_id) VALUES (new.id, new.name, new.emp_id); END",
+    "INSERT INTO attendance_employee_fts(attendance_employee_fts) VALUES ('rebuild')",
+]
+SQLITE_FTS_DROP = [
+    "DROP TRIGGER IF EXISTS attendance_employee_fts_update",
+    "DROP TRIGGER IF EXISTS attendance_employee_fts_delete",
+    "DROP TRIGGER IF EXISTS attendance_employee_fts_insert",
+    "DROP TABLE IF EXISTS attendance_employee_fts",
+]
+
+# The trigram indexes need the pg_trgm extension from PostgreSQL contrib. A role that may
+# not create it gets no indexes, and attendance.search falls back to substring matching.
+POSTGRES_EXTENSION = "CREATE EXTENSION IF NOT EXISTS pg_trgm"
+POSTGRES_FORWARD = [
+    "CREATE INDEX IF NOT EXISTS employee_name_trgm_idx ON attendance_employee USING gin (UPPER(name) gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS employee_emp_id_trgm_idx ON attendance_employee USING gin (UPPER(emp_id) gin_trgm_ops)",
+]
+
+POSTGRES_REVERSE = [
+    "DROP INDEX IF EXISTS employee_emp_id_trgm_idx",
+    "DROP INDEX IF EXISTS employee_name_trgm_idx",
+]
+
+
+def _create_extension(schema_editor):
+    """Whether pg_trgm is installed, creating it if the role may; a failure is rolled back to a savepoint"""
+    try:
+        with transaction.atomic(using=schema_editor.connection.alias):
+            schema_editor.execute(POSTGRES_EXTENSION)
+    except DatabaseError:
+        return False
+    return True
+
+
+def forward(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        statements = SQLITE_FTS_CREATE
+    elif vendor == 'postgresql' and _create_extension(schema_editor):
+        statements = POSTGRES_FORWARD
+    else:
+        statements = []
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+def backward(apps, schema_editor):
+    statements = {'sqlite': SQLITE_FTS_DROP, 'postgresql': POSTGRES_REVERSE}
+    for statement in statements.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0007_ownerdataversion'),
+    ]
+
+    operations = [
+        migrations.RunPython(forward, backward),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.5 on 2026-10-18 16:49
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0008_employee_search_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Job',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('export', 'CSV export'), ('summaries', 'Recalculate monthly summaries')], max_length=20)),
+                ('params', models.JSONField(blank=True, default=dict)),
+                ('status', models.CharField(choices=[('Queued', 'Queued'), ('Running', 'Running'), ('Done', 'Done'), ('Failed', 'Failed')], default='Queued', max_length=10)),
+                ('result_file', models.FileField(blank=True, max_length=255, upload_to='exports/')),
+                ('message', models.CharField(blank=True, max_length=255)),
+                ('error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('owner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='jobs', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at', '-id'],
+                'indexes': [models.Index(fields=['status', 'created_at'], name='job_status_created_idx'), models.Index(fields=['owner', 'created_at'], name='job_owner_created_idx')],
+            },
+        ),
+    ]
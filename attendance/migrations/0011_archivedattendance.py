@@ -0,0 +1,34 @@
+# Generated by Django 5.2.5 on 2026-10-18 17:14
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0010_packedmonthlyattendance'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedAttendance',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.PositiveSmallIntegerField()),
+                ('month', models.PositiveSmallIntegerField()),
+                ('marked', models.PositiveIntegerField(default=0)),
+                ('statuses', models.PositiveBigIntegerField(default=0)),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('employee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_months', to='attendance.employee')),
+                ('owner', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='archived_attendance', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-year', '-month', 'employee'],
+                'indexes': [models.Index(fields=['owner', 'year', 'month'], name='archive_owner_month_idx')],
+                'unique_together': {('employee', 'year', 'month')},
+            },
+        ),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 5.2.5 on 2026-10-18 17:30
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0011_archivedattendance'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PayrollRun',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.PositiveSmallIntegerField()),
+                ('month', models.PositiveSmallIntegerField()),
+                ('days_in_month', models.PositiveSmallIntegerField()),
+                ('paid_leave', models.BooleanField(default=True)),
+                ('paid_holiday', models.BooleanField(default=True)),
+                ('employee_count', models.PositiveIntegerField(default=0)),
+                ('total_salary', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('total_pay', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('owner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='payroll_runs', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at', '-id'],
+            },
+        ),
+        migrations.CreateModel(
+            name='PayrollLine',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('emp_id', models.CharField(max_length=20)),
+                ('role', models.CharField(max_length=100)),
+                ('salary', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('present', models.PositiveSmallIntegerField(default=0)),
+                ('absent', models.PositiveSmallIntegerField(default=0)),
+                ('leave', models.PositiveSmallIntegerField(default=0)),
+                ('holiday', models.PositiveSmallIntegerField(default=0)),
+                ('paid_days', models.PositiveSmallIntegerField(default=0)),
+                ('absent_deduction', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('unpaid_deduction', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('net_pay', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('employee', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='payroll_lines', to='attendance.employee')),
+                ('run', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lines', to='attendance.payrollrun')),
+            ],
+            options={
+                'ordering': ['name', 'id'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='payrollrun',
+            index=models.Index(fields=['owner', 'year', 'month'], name='payroll_owner_month_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='payrollline',
+            index=models.Index(fields=['run', 'name', 'id'], name='payroll_line_run_name_idx'),
+        ),
+    ]
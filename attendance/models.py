@@ -1,6 +1,12 @@
-from django.db import models
+import secrets
+from datetime import timedelta
+from itertools import chain
+
+from django.conf import settings
+from django.db import models, transaction
 from django.contrib.auth.models import User
 from django.core.validators import MinValueValidator
+from django.utils import timezone
 
 
 class UserProfile(models.Model):
@@ -21,9 +27,31 @@ class Employee(models.Model):
     
     class Meta:
         ordering = ['name']
+        indexes = [
+            models.Index(fields=['owner', 'name'], name='employee_owner_name_idx'),
+        ]
     
     def __str__(self):
         return f"{self.name} ({self.emp_id})"
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_owner_id = instance.__dict__.get('owner_id')
+        return instance
+    
+    def save(self, *args, **kwargs):
+        adding = self._state.adding
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            OwnerDataVersion.bump(self.owner_id, getattr(self, '_loaded_owner_id', None))
+            if not adding:
+                # Attendance and summaries carry a copy of the owner; move them along with the employee
+                Attendance.objects.filter(employee=self).exclude(owner_id=self.owner_id).update(owner_id=self.owner_id)
+                MonthlyAttendanceSummary.objects.filter(employee=self).exclude(owner_id=self.owner_id).update(owner_id=self.owner_id)
+                PackedMonthlyAttendance.objects.filter(employee=self).exclude(owner_id=self.owner_id).update(owner_id=self.owner_id)
+                ArchivedAttendance.objects.filter(employee=self).exclude(owner_id=self.owner_id).update(owner_id=self.owner_id)
+        self._loaded_owner_id = self.owner_id
 
 
 class Attendance(models.Model):
@@ -35,14 +63,361 @@ class Attendance(models.Model):
     ]
     
     employee = models.ForeignKey(Employee, on_delete=models.CASCADE)
+    # Denormalized from employee.owner so tenant-scoped scans skip the join
+    owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name='attendance_records', null=True, blank=True)
     date = models.DateField()
     status = models.CharField(max_length=10, choices=STATUS_CHOICES)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
+        # The unique constraint doubles as the (employee, date) index
         unique_together = ['employee', 'date']
-        ordering = ['-date', 'employee']
+        ordering = ['-date', 'employee_id']
+        indexes = [
+            models.Index(fields=['date', 'status'], name='attendance_date_status_idx'),
+            models.Index(fields=['owner', 'date'], name='attendance_owner_date_idx'),
+        ]
     
     def __str__(self):
         return f"{self.employee.name} - {self.date} - {self.status}"
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_employee_id = instance.__dict__.get('employee_id')
+        instance._loaded_owner_id = instance.__dict__.get('owner_id')
+        instance._loaded_date = instance.__dict__.get('date')
+        return instance
+    
+    def save(self, *args, **kwargs):
+        # Keep the monthly summary in step with the row, in the same transaction
+        self.owner_id = self.employee.owner_id
+        with transaction.atomic():
+            # The saved row replaces the archived status of its own day
+            ArchivedAttendance.restore(
+                [self.employee_id], self.date.year, self.date.month, skip=(self.employee_id, self.date)
+            )
+            super().save(*args, **kwargs)
+            months = {(self.employee_id, self.date.year, self.date.month)}
+            loaded_date = getattr(self, '_loaded_date', None)
+            if loaded_date is not None:
+                months.add((self._loaded_employee_id, loaded_date.year, loaded_date.month))
+            for employee_id, year, month in months:
+                MonthlyAttendanceSummary.refresh([employee_id], year, month)
+            OwnerDataVersion.bump(self.owner_id, getattr(self, '_loaded_owner_id', None))
+        self._loaded_employee_id = self.employee_id
+        self._loaded_owner_id = self.owner_id
+        self._loaded_date = self.date
+
+
+class MonthlyAttendanceSummary(models.Model):
+    """Precomputed per-employee status counts for one calendar month"""
+    owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name='monthly_summaries', null=True, blank=True)
+    employee = models.ForeignKey(Employee, on_delete=models.CASCADE, related_name='monthly_summaries')
+    year = models.PositiveSmallIntegerField()
+    month = models.PositiveSmallIntegerField()
+    present = models.PositiveIntegerField(default=0)
+    absent = models.PositiveIntegerField(default=0)
+    leave = models.PositiveIntegerField(default=0)
+    holiday = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        unique_together = ['employee', 'year', 'month']
+        ordering = ['-year', '-month', 'employee']
+        indexes = [
+            models.Index(fields=['owner', 'year', 'month'], name='summary_owner_month_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.employee.name} - {self.year}/{self.month:02d}"
+    
+    @property
+    def total_days(self):
+        return self.present + self.absent + self.leave + self.holiday
+    
+    @classmethod
+    def refresh(cls, employee_ids, year, month):
+        """Recount one month for the given employees and upsert their summary rows"""
+        from .summaries import count_month
+        
+        rows = count_month(year, month, employee__in=employee_ids)
+        employees = Employee.objects.filter(id__in=employee_ids).values_list('id', 'owner_id')
+        summaries = [
+            cls(employee_id=employee_id, owner_id=owner_id, year=year, month=month, **rows.get(employee_id, {}))
+            for employee_id, owner_id in employees
+        ]
+        cls.objects.bulk_create(
+            summaries,
+            update_conflicts=True,
+            unique_fields=['employee', 'year', 'month'],
+            update_fields=['owner', 'present', 'absent', 'leave', 'holiday', 'updated_at'],
+        )
+        if settings.ATTENDANCE_STORAGE == 'packed':
+            PackedMonthlyAttendance.refresh(employee_ids, year, month)
+
+
+class PackedMonthlyAttendance(models.Model):
+    """
+    One employee's month of attendance in two integers.
+    
+    Bit ``day - 1`` of ``marked`` is set when the day has a status, and bits
+    ``2 * (day - 1)`` and ``2 * (day - 1) + 1`` of ``statuses`` hold its code
+    (see attendance.packing). About 40 bytes per employee-month instead of a
+    row per day.
+    """
+    owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name='packed_attendance', null=True, blank=True)
+    employee = models.ForeignKey(Employee, on_delete=models.CASCADE, related_name='packed_months')
+    year = models.PositiveSmallIntegerField()
+    month = models.PositiveSmallIntegerField()
+    marked = models.PositiveIntegerField(default=0)
+    statuses = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        unique_together = ['employee', 'year', 'month']
+        ordering = ['-year', '-month', 'employee']
+        indexes = [
+            models.Index(fields=['owner', 'year', 'month'], name='packed_owner_month_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.employee.name} - {self.year}/{self.month:02d} (packed)"
+    
+    @classmethod
+    def refresh(cls, employee_ids, year, month):
+        """Repack one month for the given employees from their Attendance rows and archived months"""
+        from .archive import archived_rows
+        from .packing import pack_rows
+        from .summaries import month_start, next_month_start
+        
+        start, end = month_start(year, month), next_month_start(year, month)
+        rows = Attendance.objects.filter(
+            employee__in=employee_ids, date__gte=start, date__lt=end
+        ).values_list('employee_id', 'owner_id', 'date', 'status')
+        packed = pack_rows(chain(rows, archived_rows(start, end - timedelta(days=1), employee__in=employee_ids)))
+        cls.objects.filter(employee__in=employee_ids, year=year, month=month).exclude(
+            employee__in=[key[0] for key in packed]
+        ).delete()
+        cls.objects.bulk_create(
+            packed.values(),
+            update_conflicts=True,
+            unique_fields=['employee', 'year', 'month'],
+            update_fields=['owner', 'marked', 'statuses', 'updated_at'],
+        )
+
+
+class ArchivedAttendance(models.Model):
+    """
+    Cold storage: one employee's month of attendance moved out of the Attendance table.
+    
+    Packed like PackedMonthlyAttendance (see attendance.packing). A month of an
+    employee lives either here or in Attendance, never in both; writing to an
+    archived month moves it back first (see restore()).
+    """
+    owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name='archived_attendance', null=True, blank=True)
+    employee = models.ForeignKey(Employee, on_delete=models.CASCADE, related_name='archived_months')
+    year = models.PositiveSmallIntegerField()
+    month = models.PositiveSmallIntegerField()
+    marked = models.PositiveIntegerField(default=0)
+    statuses = models.PositiveBigIntegerField(default=0)
+    archived_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        unique_together = ['employee', 'year', 'month']
+        ordering = ['-year', '-month', 'employee']
+        indexes = [
+            models.Index(fields=['owner', 'year', 'month'], name='archive_owner_month_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.employee.name} - {self.year}/{self.month:02d} (archived)"
+    
+    @classmethod
+    def restore(cls, employee_ids, year, month, skip=None):
+        """
+        Move one archived month of the given employees back into Attendance; returns the number of days moved.
+        
+        ``skip`` is an (employee_id, date) pair left out, for a row about to be saved on that day.
+        """
+        from .packing import unpack
+        
+        archived = list(
+            cls.objects.filter(employee__in=employee_ids, year=year, month=month)
+            .values_list('id', 'employee_id', 'owner_id', 'marked', 'statuses')
+        )
+        if not archived:
+            return 0
+        # Counts do not change, so summaries and packed months stay as they are
+        rows = Attendance.objects.bulk_create(
+            [
+                Attendance(employee_id=employee_id, owner_id=owner_id, date=day, status=status)
+                for archive_id, employee_id, owner_id, marked, statuses in archived
+                for day, status in unpack(year, month, marked, statuses).items()
+                if (employee_id, day) != skip
+            ],
+            batch_size=1000,
+        )
+        cls.objects.filter(id__in=[row[0] for row in archived]).delete()
+        return len(rows)
+
+
+class ApiToken(models.Model):
+    """Key used by kiosks and mobile clients to call the JSON API on behalf of an owner"""
+    owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name='api_tokens')
+    name = models.CharField(max_length=100, help_text='Where the token is used, e.g. "Gate kiosk"')
+    key = models.CharField(max_length=40, unique=True, editable=False)
+    is_active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_used_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        ordering = ['owner', 'name']
+    
+    def __str__(self):
+        return f"{self.owner.username} - {self.name}"
+    
+    def save(self, *args, **kwargs):
+        if not self.key:
+            self.key = secrets.token_hex(20)
+        super().save(*args, **kwargs)
+
+
+class IdempotencyKey(models.Model):
+    """Stored API response replayed when a client retries a request with the same key"""
+    owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name='idempotency_keys')
+    key = models.CharField(max_length=255)
+    request_hash = models.CharField(max_length=64)
+    status_code = models.PositiveSmallIntegerField()
+    response = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        unique_together = ['owner', 'key']
+        indexes = [
+            models.Index(fields=['owner', 'created_at'], name='idempotency_owner_created_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.owner.username} - {self.key}"
+
+
+class OwnerDataVersion(models.Model):
+    """Counter bumped on every employee or attendance write; part of every per-owner cache key"""
+    owner = models.OneToOneField(User, on_delete=models.CASCADE, related_name='data_version')
+    version = models.PositiveBigIntegerField(default=1)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"{self.owner.username} - v{self.version}"
+    
+    @classmethod
+    def bump(cls, *owner_ids):
+        """
+        Invalidate everything cached for these owners.
+        
+        Only existing counters are bumped: an owner without one has never had
+        anything cached, because reading the version creates the counter.
+        Once the write commits, the owners' open event streams are woken.
+        """
+        from .events import notify
+        
+        owner_ids = {owner_id for owner_id in owner_ids if owner_id is not None}
+        if owner_ids:
+            cls.objects.filter(owner_id__in=owner_ids).update(version=models.F('version') + 1, updated_at=timezone.now())
+            transaction.on_commit(lambda: notify(*owner_ids))
+
+
+class Job(models.Model):
+    """Heavy task queued from a request and run by the run_worker command"""
+    KIND_CHOICES = [
+        ('export', 'CSV export'),
+        ('summaries', 'Recalculate monthly summaries'),
+    ]
+    STATUS_CHOICES = [
+        ('Queued', 'Queued'),
+        ('Running', 'Running'),
+        ('Done', 'Done'),
+        ('Failed', 'Failed'),
+    ]
+    
+    owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name='jobs')
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    params = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='Queued')
+    result_file = models.FileField(upload_to='exports/', max_length=255, blank=True)
+    message = models.CharField(max_length=255, blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        ordering = ['-created_at', '-id']
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='job_status_created_idx'),
+            models.Index(fields=['owner', 'created_at'], name='job_owner_created_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.owner.username} - {self.get_kind_display()} ({self.status})"
+    
+    @property
+    def is_finished(self):
+        return self.status in ('Done', 'Failed')
+
+
+class PayrollRun(models.Model):
+    """One month's pay for every employee of an owner, frozen when it was calculated"""
+    owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name='payroll_runs')
+    year = models.PositiveSmallIntegerField()
+    month = models.PositiveSmallIntegerField()
+    days_in_month = models.PositiveSmallIntegerField()
+    paid_leave = models.BooleanField(default=True)
+    paid_holiday = models.BooleanField(default=True)
+    employee_count = models.PositiveIntegerField(default=0)
+    total_salary = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    total_pay = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['-created_at', '-id']
+        indexes = [
+            models.Index(fields=['owner', 'year', 'month'], name='payroll_owner_month_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.owner.username} - payroll {self.year}/{self.month:02d}"
+
+
+class PayrollLine(models.Model):
+    """
+    One employee's pay in a PayrollRun.
+    
+    Name, ID, role and salary are copied, so the run still reads as it was
+    paid after the employee is edited or deleted.
+    """
+    run = models.ForeignKey(PayrollRun, on_delete=models.CASCADE, related_name='lines')
+    employee = models.ForeignKey(Employee, on_delete=models.SET_NULL, null=True, blank=True, related_name='payroll_lines')
+    name = models.CharField(max_length=100)
+    emp_id = models.CharField(max_length=20)
+    role = models.CharField(max_length=100)
+    salary = models.DecimalField(max_digits=10, decimal_places=2)
+    present = models.PositiveSmallIntegerField(default=0)
+    absent = models.PositiveSmallIntegerField(default=0)
+    leave = models.PositiveSmallIntegerField(default=0)
+    holiday = models.PositiveSmallIntegerField(default=0)
+    paid_days = models.PositiveSmallIntegerField(default=0)
+    absent_deduction = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    unpaid_deduction = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    net_pay = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    
+    class Meta:
+        ordering = ['name', 'id']
+        indexes = [
+            models.Index(fields=['run', 'name', 'id'], name='payroll_line_run_name_idx'),
+        ]
+    
+    def __str__(self):
+        return f"{self.name} ({self.emp_id}) - {self.net_pay}"
@@ -0,0 +1,154 @@
+from datetime import date, timedelta
+
+from django.db import transaction
+
+from .models import Attendance, OwnerDataVersion, PackedMonthlyAttendance
+from .summaries import COUNT_FIELDS, STATUSES, month_start, months_filter, next_month_start
+
+
+# Two bits per day: a status's code is its position in Attendance.STATUS_CHOICES, so
+# stored months depend on that order and there is no room for a fifth status
+STATUS_CODES = {status: code for code, status in enumerate(STATUSES)}
+CODE_STATUSES = dict(enumerate(STATUSES))
+# The low bit of every day's two-bit slot
+LOW_BITS = int('01' * 31, 2)
+BATCH_SIZE = 1000
+
+
+def pack_day(marked, statuses, day, status):
+    """Set ``day`` (1-31) to ``status`` in a packed month; returns the new (marked, statuses)"""
+    shift = 2 * (day - 1)
+    return marked | (1 << (day - 1)), (statuses & ~(3 << shift)) | (STATUS_CODES[status] << shift)
+
+
+def pack_rows(rows, model=PackedMonthlyAttendance):
+    """
+    Pack ``(employee_id, owner_id, date, status)`` rows into unsaved months of ``model``.
+
+    Returns a dict keyed by ``(employee_id, year, month)``.
+    """
+    packed = {}
+    for employee_id, owner_id, day, status in rows:
+        key = (employee_id, day.year, day.month)
+        month = packed.get(key)
+        if month is None:
+            month = packed[key] = model(
+                employee_id=employee_id, owner_id=owner_id, year=day.year, month=day.month
+            )
+        month.marked, month.statuses = pack_day(month.marked, month.statuses, day.day, status)
+    return packed
+
+
+def unpack(year, month, marked, statuses):
+    """{date: status} for the marked days of a packed month"""
+    days = {}
+    day = 1
+    while marked:
+        if marked & 1:
+            days[date(year, month, day)] = CODE_STATUSES[statuses & 3]
+        marked >>= 1
+        statuses >>= 2
+        day += 1
+    return days
+
+
+def _spread(marked):
+    """Widen the one-bit-per-day mask to the low bit of each two-bit slot"""
+    spread = 0
+    day = 0
+    while marked:
+        if marked & 1:
+            spread |= 1 << (2 * day)
+        marked >>= 1
+        day += 1
+    return spread
+
+
+def count_statuses(marked, statuses):
+    """Per-status day counts of a packed month, using popcounts instead of decoding each day"""
+    slots = _spread(marked)
+    low = statuses & LOW_BITS
+    high = (statuses >> 1) & LOW_BITS
+    # Codes are 0-3; a day has code c when its low bit equals c & 1 and its high bit c >> 1
+    matches = [
+        slots & ~low & ~high,
+        slots & low & ~high,
+        slots & ~low & high,
+        slots & low & high,
+    ]
+    return {field: matches[code].bit_count() for code, field in enumerate(COUNT_FIELDS)}
+
+
+def _packed_months(owner, start, end, employee_ids=None):
+    months = PackedMonthlyAttendance.objects.filter(owner=owner).filter(months_filter(start, end))
+    if employee_ids is not None:
+        months = months.filter(employee_id__in=employee_ids)
+    return months.order_by().values_list('employee_id', 'year', 'month', 'marked', 'statuses')
+
+
+def read_range(owner, start, end, employee_ids=None):
+    """{employee_id: {date: status}} for start..end (inclusive), decoded from one query over packed months"""
+    result = {}
+    for employee_id, year, month, marked, statuses in _packed_months(owner, start, end, employee_ids):
+        days = result.setdefault(employee_id, {})
+        for day, status in unpack(year, month, marked, statuses).items():
+            if start <= day <= end:
+                days[day] = status
+    return result
+
+
+def read_month(owner, year, month, employee_ids=None):
+    end = next_month_start(year, month) - timedelta(days=1)
+    return read_range(owner, month_start(year, month), end, employee_ids)
+
+
+def read_year(owner, year, employee_ids=None):
+    return read_range(owner, date(int(year), 1, 1), date(int(year), 12, 31), employee_ids)
+
+
+def month_counts(owner, year, month):
+    """{employee_id: per-status counts} for one month from the packed table"""
+    start = month_start(year, month)
+    return {
+        employee_id: count_statuses(marked, statuses)
+        for employee_id, year, month, marked, statuses in _packed_months(owner, start, start)
+    }
+
+
+def _attendance_rows(owner_id, start, end):
+    from .archive import archived_rows
+
+    first, last = month_start(start.year, start.month), next_month_start(end.year, end.month)
+    rows = Attendance.objects.filter(owner_id=owner_id, date__gte=first, date__lt=last)
+    yield from rows.order_by().values_list('employee_id', 'owner_id', 'date', 'status').iterator(chunk_size=5000)
+    yield from archived_rows(first, last - timedelta(days=1), owner_id=owner_id)
+
+
+def pack_owner(owner_id, start, end):
+    """Replace one owner's packed months touched by start..end from Attendance; returns the month count"""
+    packed = pack_rows(_attendance_rows(owner_id, start, end))
+    with transaction.atomic():
+        PackedMonthlyAttendance.objects.filter(owner_id=owner_id).filter(months_filter(start, end)).delete()
+        PackedMonthlyAttendance.objects.bulk_create(packed.values(), batch_size=BATCH_SIZE)
+        OwnerDataVersion.bump(owner_id)
+    return len(packed)
+
+
+def verify_owner(owner_id, start, end):
+    """Compare one owner's packed months against Attendance; returns a list of mismatch descriptions"""
+    expected = {
+        key: (month.marked, month.statuses)
+        for key, month in pack_rows(_attendance_rows(owner_id, start, end)).items()
+    }
+    stored = PackedMonthlyAttendance.objects.filter(owner_id=owner_id).filter(months_filter(start, end))
+    stored = {
+        (employee_id, year, month): (marked, statuses)
+        for employee_id, year, month, marked, statuses
+        in stored.values_list('employee_id', 'year', 'month', 'marked', 'statuses')
+    }
+    mismatches = []
+    for key in sorted(expected.keys() | stored.keys()):
+        if expected.get(key) != stored.get(key):
+            employee_id, year, month = key
+            mismatches.append(f"employee {employee_id} {year}/{month:02d}: packed month out of date")
+    return mismatches
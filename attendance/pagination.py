@@ -0,0 +1,110 @@
+import base64
+import json
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.db.models import Q
+
+
+MAX_PAGE_SIZE = 500
+
+
+def page_size(request):
+    """Page size from ?size=, falling back to ATTENDANCE_PAGE_SIZE and capped at MAX_PAGE_SIZE"""
+    default = getattr(settings, 'ATTENDANCE_PAGE_SIZE', 50)
+    try:
+        size = int(request.GET.get('size', default))
+    except ValueError:
+        size = default
+    return max(1, min(size, MAX_PAGE_SIZE))
+
+
+def encode_cursor(values):
+    raw = json.dumps([value.isoformat() if hasattr(value, 'isoformat') else value for value in values])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(model, fields, cursor):
+    """Turn a cursor back into typed key values; returns None for anything malformed"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        values = json.loads(raw)
+        if not isinstance(values, list) or len(values) != len(fields):
+            return None
+        return [model._meta.get_field(field).to_python(value) for field, value in zip(fields, values)]
+    except Exception:
+        return None
+
+
+def _seek(fields, values, forward):
+    """WHERE clause selecting rows strictly after (or before) the key, for a composite ascending order"""
+    lookup = 'gt' if forward else 'lt'
+    condition = Q()
+    for position, field in enumerate(fields):
+        step = Q(**{f'{field}__{lookup}': values[position]})
+        for previous, value in zip(fields[:position], values[:position]):
+            step &= Q(**{previous: value})
+        condition |= step
+    return condition
+
+
+class KeysetPage:
+    """One page of a seek-paginated queryset plus the cursors around it"""
+
+    def __init__(self, items, fields, has_next, has_previous):
+        self.items = items
+        self.has_next = has_next
+        self.has_previous = has_previous
+        self.next_cursor = encode_cursor([getattr(items[-1], f) for f in fields]) if items and has_next else None
+        self.previous_cursor = encode_cursor([getattr(items[0], f) for f in fields]) if items and has_previous else None
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+
+def _page_query(queryset, fields, after, before, size):
+    forward = not before
+    cursor = decode_cursor(queryset.model, fields, after or before) if (after or before) else None
+    if cursor is not None:
+        queryset = queryset.filter(_seek(fields, cursor, forward))
+    ordering = fields if forward else [f'-{field}' for field in fields]
+    return queryset.order_by(*ordering)[:size + 1], forward, cursor is not None
+
+
+def _build_page(rows, fields, size, forward, has_cursor):
+    more = len(rows) > size
+    rows = rows[:size]
+    if forward:
+        return KeysetPage(rows, fields, has_next=more, has_previous=has_cursor)
+    rows.reverse()
+    return KeysetPage(rows, fields, has_next=True, has_previous=more)
+
+
+def keyset_paginate(queryset, fields, after=None, before=None, size=50):
+    """
+    Fetch one page of ``queryset`` ordered by ``fields``, which must end in a unique column.
+
+    ``after`` / ``before`` are cursors from a previous page. Each page is a
+    single indexed range scan with LIMIT size + 1, so the cost does not grow
+    with how deep into the list the page is.
+    """
+    query, forward, has_cursor = _page_query(queryset, fields, after, before, size)
+    return _build_page(list(query), fields, size, forward, has_cursor)
+
+
+async def akeyset_paginate(queryset, fields, after=None, before=None, size=50):
+    """Async keyset_paginate() for async views"""
+    query, forward, has_cursor = _page_query(queryset, fields, after, before, size)
+    return _build_page([row async for row in query], fields, size, forward, has_cursor)
+
+
+def page_urls(request, page):
+    """Query strings for the previous/next links, keeping every other GET parameter"""
+    params = {key: value for key, value in request.GET.items() if key not in ('after', 'before')}
+    return {
+        'next_query': urlencode({**params, 'after': page.next_cursor}) if page.next_cursor else None,
+        'previous_query': urlencode({**params, 'before': page.previous_cursor}) if page.previous_cursor else None,
+    }
@@ -0,0 +1,164 @@
+import gzip
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections, transaction
+from django.db.models import Max, Min, Q
+
+from .archive import restore_owner
+from .models import (
+    ArchivedAttendance, Attendance, Employee, MonthlyAttendanceSummary, OwnerDataVersion, PackedMonthlyAttendance,
+)
+from .packing import pack_owner
+from .summaries import owner_ids, rebuild_owner
+
+
+BATCH_SIZE = 1000
+
+
+class Archive:
+    """
+    Gzipped NDJSON in Django's jsonl fixture format, shared by the purge workers.
+
+    Name the file ``*.jsonl.gz`` and ``manage.py loaddata`` restores it; run
+    rebuild_summaries afterwards, as loaddata skips the summary bookkeeping.
+    """
+
+    def __init__(self, path):
+        # 'x' refuses to overwrite an earlier archive
+        self._file = gzip.open(path, 'xt', encoding='utf-8')
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self._file.close()
+
+    def write(self, model, rows):
+        """Append values() dicts of model, in the layout of serializers.serialize('jsonl', ...)"""
+        label = model._meta.label_lower
+        fields = [(field.name, field.attname) for field in model._meta.concrete_fields if not field.primary_key]
+        data = ''.join(
+            json.dumps(
+                {'model': label, 'pk': row['pk'], 'fields': {name: row[attname] for name, attname in fields}},
+                cls=DjangoJSONEncoder,
+            ) + '\n'
+            for row in rows
+        )
+        with self._lock:
+            self._file.write(data)
+            # Push the chunk to the OS before its rows are deleted
+            self._file.flush()
+
+
+def _raw_delete(queryset):
+    # Skips the collector, which would load every row and run the per-row summary
+    # signal; purge() fixes up summaries per month instead
+    return queryset._raw_delete(queryset.db)
+
+
+def _delete_employees(queryset):
+    # Employees go through the collector so cascades (summaries, packed months) follow
+    return queryset.delete()[1].get(Employee._meta.label, 0)
+
+
+def _delete_chunks(queryset, low, high, delete, batch_size, archive):
+    """Delete rows of queryset with low <= pk < high in PK order, one short transaction per chunk"""
+    deleted, last = 0, low - 1
+    while True:
+        with transaction.atomic():
+            chunk = queryset.filter(pk__gt=last, pk__lt=high).order_by('pk')
+            if archive is None:
+                ids = list(chunk.values_list('pk', flat=True)[:batch_size])
+            else:
+                # values() rows serialize several times faster than model instances
+                fields = [field.attname for field in queryset.model._meta.concrete_fields]
+                rows = list(chunk.select_for_update().values('pk', *fields)[:batch_size])
+                ids = [row['pk'] for row in rows]
+                archive.write(queryset.model, rows)
+            if not ids:
+                return deleted
+            # Re-apply the scope in case a row changed since it was read
+            deleted += delete(queryset.filter(pk__in=ids))
+        last = ids[-1]
+
+
+def _pk_ranges(queryset, workers):
+    bounds = queryset.aggregate(low=Min('pk'), high=Max('pk'))
+    if bounds['low'] is None:
+        return []
+    step = -(-(bounds['high'] - bounds['low'] + 1) // workers)
+    return [(low, min(low + step, bounds['high'] + 1)) for low in range(bounds['low'], bounds['high'] + 1, step)]
+
+
+def delete_in_chunks(queryset, delete=_raw_delete, batch_size=BATCH_SIZE, workers=1, archive=None):
+    """
+    Delete everything in queryset a chunk at a time; returns the number of rows deleted.
+
+    The PK range is split evenly between ``workers`` threads, each with its own
+    connection, so no two workers ever touch the same rows. SQLite allows a
+    single writer at a time, so there the chunks always run one after another.
+    """
+    if connections[queryset.db].vendor == 'sqlite':
+        workers = 1
+
+    def run(bounds):
+        try:
+            return _delete_chunks(queryset, *bounds, delete, batch_size, archive)
+        finally:
+            connections.close_all()
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        return sum(pool.map(run, _pk_ranges(queryset, max(1, workers))))
+
+
+def _months_before(model, owner_id, before):
+    rows = model.objects.filter(Q(year__lt=before.year) | Q(year=before.year, month__lt=before.month))
+    return rows if owner_id is None else rows.filter(owner_id=owner_id)
+
+
+def purge(owner_id=None, before=None, batch_size=BATCH_SIZE, workers=1, archive=None):
+    """
+    Delete attendance, and employees unless ``before`` is given, for one owner or everyone.
+
+    With ``before`` only attendance dated before it goes; summaries and packed
+    months of the purged months are dropped and the month containing the cutoff
+    is recounted. Archived months are purged the same way. Returns a dict of
+    deleted row counts.
+    """
+    owners = [owner_id] if owner_id is not None else owner_ids()
+    records = Attendance.objects.all()
+    archived = ArchivedAttendance.objects.all()
+    if owner_id is not None:
+        records = records.filter(owner_id=owner_id)
+        archived = archived.filter(owner_id=owner_id)
+    if before is not None:
+        records = records.filter(date__lt=before)
+        archived = _months_before(ArchivedAttendance, owner_id, before)
+        if before.day != 1:
+            # Bring an archived cutoff month back so its early days go with the other rows
+            for owner in owners:
+                restore_owner(owner, before, before)
+
+    deleted = {
+        'attendance': delete_in_chunks(records, batch_size=batch_size, workers=workers, archive=archive),
+        'archived months': delete_in_chunks(archived, batch_size=batch_size, workers=workers, archive=archive),
+    }
+    if before is None:
+        employees = Employee.objects.all() if owner_id is None else Employee.objects.filter(owner_id=owner_id)
+        deleted['employees'] = delete_in_chunks(employees, _delete_employees, batch_size, workers, archive)
+    else:
+        for model in (MonthlyAttendanceSummary, PackedMonthlyAttendance):
+            delete_in_chunks(_months_before(model, owner_id, before), batch_size=batch_size, workers=workers)
+        if before.day != 1:
+            # Both recount the whole month containing the cutoff
+            for owner in owners:
+                rebuild_owner(owner, before, before)
+                if settings.ATTENDANCE_STORAGE == 'packed':
+                    pack_owner(owner, before, before)
+    OwnerDataVersion.bump(*owners)
+    return deleted
@@ -0,0 +1,159 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db.models import F, FilteredRelation, Q, Value
+from django.db.models.functions import Coalesce, TruncMonth
+
+from .archive import archived_counts
+from .models import Attendance, Employee
+from .packing import month_counts
+from .summaries import COUNT_FIELDS, add_counts, month_start, next_month_start, status_counts
+
+
+MAX_PIVOT_MONTHS = 36
+
+
+def count_cell(counts):
+    """Per-status counts plus total days and attendance percentage"""
+    present = counts.get('present', 0)
+    absent = counts.get('absent', 0)
+    leave = counts.get('leave', 0)
+    holiday = counts.get('holiday', 0)
+
+    total_days = present + absent + leave + holiday
+    percentage = (present / total_days * 100) if total_days > 0 else 0
+
+    return {
+        'present': present,
+        'absent': absent,
+        'leave': leave,
+        'holiday': holiday,
+        'total_days': total_days,
+        'percentage': round(percentage, 2),
+    }
+
+
+def summary_row(employee, counts):
+    """Turn raw per-status counts into the row shape used by reports"""
+    return {'employee': employee, **count_cell(counts)}
+
+
+def _monthly_employees(owner, year, month):
+    return Employee.objects.filter(owner=owner).annotate(
+        summary=FilteredRelation(
+            'monthly_summaries',
+            condition=Q(monthly_summaries__year=int(year), monthly_summaries__month=int(month)),
+        ),
+        **{field: Coalesce(F(f'summary__{field}'), Value(0)) for field in COUNT_FIELDS}
+    )
+
+
+def packed_monthly_summary(owner, year, month):
+    """monthly_summary() computed from packed months: two queries, counts by popcount"""
+    counts = month_counts(owner, year, month)
+    return [summary_row(employee, counts.get(employee.id, {})) for employee in Employee.objects.filter(owner=owner)]
+
+
+def monthly_summary(owner, year, month):
+    """Per-employee status counts for a month, read from the precomputed summaries in one query"""
+    if settings.ATTENDANCE_STORAGE == 'packed':
+        return packed_monthly_summary(owner, year, month)
+    return [
+        summary_row(employee, {field: getattr(employee, field) for field in COUNT_FIELDS})
+        for employee in _monthly_employees(owner, year, month)
+    ]
+
+
+async def amonthly_summary(owner, year, month):
+    """Async monthly_summary() for async views"""
+    if settings.ATTENDANCE_STORAGE == 'packed':
+        return await sync_to_async(packed_monthly_summary)(owner, year, month)
+    return [
+        summary_row(employee, {field: getattr(employee, field) for field in COUNT_FIELDS})
+        async for employee in _monthly_employees(owner, year, month)
+    ]
+
+
+def range_months(start, end):
+    """First day of every month touched by start..end"""
+    months = []
+    month = month_start(start.year, start.month)
+    while month <= end:
+        months.append(month)
+        month = next_month_start(month.year, month.month)
+    return months
+
+
+def range_pivot(owner, start, end):
+    """
+    Employee x month status counts for start..end (inclusive) from one grouped query.
+
+    The date range is a plain range predicate on the (owner, date) index, so
+    partial months at either end are counted exactly. Archived months are
+    added from ArchivedAttendance. Employees without attendance in the range
+    are left out.
+    """
+    grouped = (
+        Attendance.objects.filter(owner=owner, date__gte=start, date__lte=end)
+        .annotate(month=TruncMonth('date'))
+        .order_by()
+        .values('employee_id', 'employee__name', 'employee__emp_id', 'month')
+        .annotate(**status_counts())
+    )
+
+    months = range_months(start, end)
+    column = {month: index for index, month in enumerate(months)}
+    employees = {}
+
+    def add(employee_id, name, emp_id, month, counts):
+        employee = employees.setdefault(employee_id, {
+            'id': employee_id,
+            'name': name,
+            'emp_id': emp_id,
+            'counts': [dict.fromkeys(COUNT_FIELDS, 0) for month in months],
+        })
+        add_counts(employee['counts'][column[month]], counts)
+
+    for row in grouped:
+        add(row['employee_id'], row['employee__name'], row['employee__emp_id'], row['month'], row)
+
+    archived = archived_counts(start, end, owner_id=owner.id)
+    if archived:
+        names = {
+            employee_id: (name, emp_id) for employee_id, name, emp_id
+            in Employee.objects.filter(id__in={key[0] for key in archived}).values_list('id', 'name', 'emp_id')
+        }
+        for (employee_id, year, month), counts in archived.items():
+            add(employee_id, *names[employee_id], month_start(year, month), counts)
+
+    rows = []
+    month_totals = [dict.fromkeys(COUNT_FIELDS, 0) for month in months]
+    for employee in sorted(employees.values(), key=lambda employee: (employee['name'], employee['id'])):
+        for totals, counts in zip(month_totals, employee['counts']):
+            for field in COUNT_FIELDS:
+                totals[field] += counts[field]
+        rows.append({
+            'id': employee['id'],
+            'name': employee['name'],
+            'emp_id': employee['emp_id'],
+            'months': [count_cell(counts) for counts in employee['counts']],
+            'total': count_cell({field: sum(counts[field] for counts in employee['counts']) for field in COUNT_FIELDS}),
+        })
+
+    return {
+        'start': start,
+        'end': end,
+        'months': months,
+        'rows': rows,
+        'totals': [count_cell(totals) for totals in month_totals],
+        'total': count_cell({field: sum(totals[field] for totals in month_totals) for field in COUNT_FIELDS}),
+    }
+
+
+def build_chart_data(summary_data):
+    """Chart.js payload for the report page"""
+    return {
+        'labels': [row['employee'].name for row in summary_data],
+        'present': [row['present'] for row in summary_data],
+        'absent': [row['absent'] for row in summary_data],
+        'leave': [row['leave'] for row in summary_data],
+    }
@@ -0,0 +1,92 @@
+import contextvars
+import random
+
+from django.conf import settings
+
+
+# Apps whose tables reporting views may read from a replica; auth and sessions stay on the primary
+REPLICA_APPS = {'attendance'}
+# Set on responses to requests that wrote; while present, the user's requests read from the primary
+PRIMARY_COOKIE = 'attendance_primary'
+
+_request = contextvars.ContextVar('attendance_db_routing', default=None)
+
+
+class RequestRouting:
+    """Where the current request reads from, and whether it has written"""
+
+    def __init__(self, replica=None):
+        self.replica = replica
+        self.wrote = False
+
+
+def start_request(use_replica):
+    """Begin routing a request, reading from one replica for all of it when ``use_replica``; returns a reset token"""
+    replica = random.choice(settings.DATABASE_REPLICAS) if use_replica and settings.DATABASE_REPLICAS else None
+    return _request.set(RequestRouting(replica))
+
+
+def current():
+    return _request.get()
+
+
+def end_request(token):
+    _request.reset(token)
+
+
+def iterate(content, routing):
+    """Yield from a streaming response body with ``routing`` active, as the body is read after the view returned"""
+    iterator = iter(content)
+    while True:
+        token = _request.set(routing)
+        try:
+            chunk = next(iterator)
+        except StopIteration:
+            return
+        finally:
+            _request.reset(token)
+        yield chunk
+
+
+async def aiterate(content, routing):
+    iterator = aiter(content)
+    while True:
+        token = _request.set(routing)
+        try:
+            chunk = await anext(iterator)
+        except StopAsyncIteration:
+            return
+        finally:
+            _request.reset(token)
+        yield chunk
+
+
+class ReplicaRouter:
+    """
+    Send reads of attendance data to a replica while a reporting request runs.
+
+    ReplicaMiddleware decides per request whether reads may go to a replica.
+    Every write goes to ``default``, and asking for the write database pins
+    the rest of the request to the primary, so it reads its own writes.
+    """
+
+    def db_for_read(self, model, **hints):
+        routing = _request.get()
+        if routing is not None and routing.replica and model._meta.app_label in REPLICA_APPS:
+            return routing.replica
+        return 'default'
+
+    def db_for_write(self, model, **hints):
+        routing = _request.get()
+        if routing is not None:
+            routing.replica = None
+            routing.wrote = True
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get their schema from the primary through replication
+        return db == 'default'
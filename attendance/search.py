@@ -0,0 +1,239 @@
+from django.db import connection, connections, transaction
+from django.db.models import BooleanField, ExpressionWrapper, FloatField, Q
+from django.db.models.expressions import RawSQL
+
+from .models import Employee
+
+
+FTS_TABLE = 'attendance_employee_fts'
+# Lowest trigram similarity between a query word and a name word (SQLite), and lowest
+# pg_trgm word_similarity() of the query within a name (PostgreSQL), for a fuzzy match
+MIN_SIMILARITY = 0.3
+MIN_WORD_SIMILARITY = 0.4
+CANDIDATES = 200
+
+# External-content FTS5 table over attendance_employee, kept in sync by triggers
+SQLITE_FTS_CREATE = [
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+    "name, emp_id, content='attendance_employee', content_rowid='id', tokenize='trigram')",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_insert AFTER INSERT ON attendance_employee BEGIN "
+    f"INSERT INTO {FTS_TABLE}(rowid, name, emp_id) VALUES (new.id, new.name, new.emp_id); END",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_delete AFTER DELETE ON attendance_employee BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, emp_id) VALUES ('delete', old.id, old.name, old.emp_id); END",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_update AFTER UPDATE OF name, emp_id ON attendance_employee BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, emp_id) VALUES ('delete', old.id, old.name, old.emp_id); "
+    f"INSERT INTO {FTS_TABLE}(rowid, name, emp_id) VALUES (new.id, new.name, new.emp_id); END",
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')",
+]
+# GIN trigram indexes over attendance_employee; they need the pg_trgm extension
+POSTGRES_TRGM_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS employee_name_trgm_idx ON attendance_employee USING gin (UPPER(name) gin_trgm_ops)",
+    "CREATE INDEX IF NOT EXISTS employee_emp_id_trgm_idx ON attendance_employee USING gin (UPPER(emp_id) gin_trgm_ops)",
+]
+SQLITE_FTS_DROP = [
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_update",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_delete",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_insert",
+    f"DROP TABLE IF EXISTS {FTS_TABLE}",
+]
+
+
+def ensure_fts_index(using='default'):
+    """
+    Recreate the SQLite FTS triggers if they are missing and resync the index.
+
+    SQLite migrations that rebuild attendance_employee drop its triggers, so
+    this runs after every migrate.
+    """
+    conn = connections[using]
+    if conn.vendor != 'sqlite':
+        return
+    with conn.cursor() as cursor:
+        cursor.execute(
+            "SELECT COUNT(*) FROM sqlite_master WHERE type = 'trigger' AND name LIKE %s",
+            [f'{FTS_TABLE}_%'],
+        )
+        if cursor.fetchone()[0] == 3:
+            return
+        for statement in SQLITE_FTS_CREATE:
+            cursor.execute(statement)
+
+
+# Connection alias -> whether pg_trgm is installed, checked once per process
+_trigrams = {}
+
+
+def has_trigrams(conn):
+    if conn.alias not in _trigrams:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm')")
+            _trigrams[conn.alias] = cursor.fetchone()[0]
+    return _trigrams[conn.alias]
+
+
+def ensure_trigram_indexes(using='default'):
+    """
+    Create the PostgreSQL trigram indexes if pg_trgm is installed and they are missing.
+
+    Migration 0008 skips them when the database role may not create the
+    extension; once an administrator has, the next migrate adds them.
+    """
+    conn = connections[using]
+    if conn.vendor != 'postgresql':
+        return
+    _trigrams.pop(conn.alias, None)
+    if not has_trigrams(conn):
+        return
+    with conn.cursor() as cursor:
+        for statement in POSTGRES_TRGM_INDEXES:
+            cursor.execute(statement)
+
+
+def _escape_like(value):
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def trigrams(value):
+    """Trigram set in the style of pg_trgm: lower-cased words padded with two leading and one trailing space"""
+    grams = set()
+    for word in value.lower().split():
+        padded = f'  {word} '
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def similarity(a, b):
+    left, right = trigrams(a), trigrams(b)
+    if not left or not right:
+        return 0.0
+    return len(left & right) / len(left | right)
+
+
+def word_similarity(query, value):
+    """Best similarity between a word of ``query`` and a word of ``value``, so one misspelt word still matches"""
+    return max((similarity(term, word) for term in query.split() for word in value.split()), default=0.0)
+
+
+def _result(employee, score):
+    return {'id': employee.id, 'name': employee.name, 'emp_id': employee.emp_id, 'role': employee.role, 'score': round(score, 3)}
+
+
+def _search_postgres(owner, query, limit):
+    # Served by the GIN (UPPER(col) gin_trgm_ops) indexes from migration 0008, which support
+    # LIKE and <%. "q <% name" holds when some run of words in name is similar to q.
+    table = Employee._meta.db_table
+    name, emp_id = f'UPPER("{table}"."name")', f'UPPER("{table}"."emp_id")'
+    prefix = _escape_like(query) + '%'
+    employees = (
+        Employee.objects.filter(owner=owner)
+        .filter(RawSQL(
+            f'({name} LIKE UPPER(%s) OR {emp_id} LIKE UPPER(%s) OR UPPER(%s) <%% {name} OR UPPER(%s) <%% {emp_id})',
+            [prefix, prefix, query, query],
+            output_field=BooleanField(),
+        ))
+        .annotate(
+            score=RawSQL(
+                f'GREATEST(word_similarity(UPPER(%s), {name}), word_similarity(UPPER(%s), {emp_id}))',
+                [query, query],
+                output_field=FloatField(),
+            ),
+            is_prefix=RawSQL(
+                f'({name} LIKE UPPER(%s) OR {emp_id} LIKE UPPER(%s))',
+                [prefix, prefix],
+                output_field=BooleanField(),
+            ),
+        )
+        .order_by('-is_prefix', '-score', 'name', 'id')[:limit]
+    )
+    with transaction.atomic(), connection.cursor() as cursor:
+        # <% compares against this setting; the default of 0.6 misses one-letter typos in short names
+        cursor.execute("SELECT set_config('pg_trgm.word_similarity_threshold', %s, true)", [str(MIN_WORD_SIMILARITY)])
+        return [_result(employee, 1.0 if employee.is_prefix else employee.score) for employee in employees]
+
+
+def _fts_ids(owner, match):
+    table = Employee._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT e.id FROM {FTS_TABLE} f JOIN {table} e ON e.id = f.rowid '
+            f'WHERE {FTS_TABLE} MATCH %s AND e.owner_id = %s ORDER BY f.rank LIMIT %s',
+            [match, owner.pk, CANDIDATES],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def _quote(term):
+    return '"{}"'.format(term.replace('"', '""'))
+
+
+def _search_sqlite(owner, query, limit):
+    if len(query) < 3:
+        # Too short for trigrams: a prefix scan within the owner's (owner, name) index range
+        return _search_prefix(owner, query, limit)
+
+    # The trigram tokenizer matches a quoted string as a substring, which covers every
+    # prefix match. OR-ing the query's trigrams finds names sharing most of them, which
+    # tolerates typos.
+    grams = sorted({query[i:i + 3] for i in range(len(query) - 2)})
+    candidate_ids = set(_fts_ids(owner, _quote(query))) | set(_fts_ids(owner, ' OR '.join(map(_quote, grams))))
+
+    lowered = query.lower()
+    scored = []
+    for employee in Employee.objects.filter(id__in=candidate_ids):
+        if employee.name.lower().startswith(lowered) or employee.emp_id.lower().startswith(lowered):
+            score, is_prefix = 1.0, True
+        else:
+            score, is_prefix = max(word_similarity(query, employee.name), word_similarity(query, employee.emp_id)), False
+        if is_prefix or score >= MIN_SIMILARITY:
+            scored.append((not is_prefix, -score, employee.name, employee.id, employee))
+    scored.sort(key=lambda item: item[:4])
+    return [_result(item[4], -item[1]) for item in scored[:limit]]
+
+
+def _search_contains(owner, query, limit):
+    # PostgreSQL without pg_trgm: substring matches, prefix matches first
+    employees = (
+        Employee.objects.filter(owner=owner)
+        .filter(Q(name__icontains=query) | Q(emp_id__icontains=query))
+        .annotate(is_prefix=ExpressionWrapper(
+            Q(name__istartswith=query) | Q(emp_id__istartswith=query), output_field=BooleanField()
+        ))
+        .order_by('-is_prefix', 'name', 'id')[:limit]
+    )
+    return [
+        _result(employee, 1.0 if employee.is_prefix else max(
+            word_similarity(query, employee.name), word_similarity(query, employee.emp_id)
+        ))
+        for employee in employees
+    ]
+
+
+def _search_prefix(owner, query, limit):
+    employees = (
+        Employee.objects.filter(owner=owner)
+        .filter(Q(name__istartswith=query) | Q(emp_id__istartswith=query))
+        .order_by('name', 'id')[:limit]
+    )
+    return [_result(employee, 1.0) for employee in employees]
+
+
+def search_employees(owner, query, limit=10):
+    """
+    Prefix and fuzzy search over the owner's employee names and IDs.
+
+    Prefix matches come first, then typo-tolerant trigram matches ranked by
+    how close the query comes to a word of the name or ID. Postgres uses
+    pg_trgm GIN indexes, or substring matching where the extension is not
+    installed; SQLite uses an FTS5 trigram table kept in sync by triggers;
+    other backends get prefix matching only.
+    """
+    query = ' '.join(query.split())
+    if not query:
+        return []
+    if connection.vendor == 'postgresql':
+        if not has_trigrams(connection):
+            return _search_contains(owner, query, limit)
+        return _search_postgres(owner, query, limit)
+    if connection.vendor == 'sqlite':
+        return _search_sqlite(owner, query, limit)
+    return _search_prefix(owner, query, limit)
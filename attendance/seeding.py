@@ -0,0 +1,110 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+
+from .models import Attendance, Employee
+from .packing import pack_owner
+from .purging import purge
+from .summaries import rebuild_owner
+
+
+BATCH_SIZE = 5000
+FIRST_NAMES = [
+    'Aarav', 'Aisha', 'Arjun', 'Deepa', 'Farhan', 'Gita', 'Imran', 'Kavya', 'Lakshmi', 'Manoj',
+    'Meera', 'Nikhil', 'Pooja', 'Rahul', 'Ravi', 'Sana', 'Suresh', 'Tara', 'Vikram', 'Zoya',
+]
+LAST_NAMES = [
+    'Bose', 'Das', 'Gupta', 'Iyer', 'Joshi', 'Khan', 'Kumar', 'Menon', 'Nair', 'Patel',
+    'Rao', 'Reddy', 'Shah', 'Sharma', 'Singh', 'Verma',
+]
+ROLES = ['Cook', 'Driver', 'Cleaner', 'Guard', 'Gardener', 'Cashier', 'Helper', 'Supervisor']
+# Chance per working day that a day goes unmarked or a run of leave starts
+UNMARKED = 0.02
+LEAVE_START = 0.01
+LEAVE_DAYS = (1, 5)
+
+
+def employee_days(rng, start, days):
+    """
+    Yield (date, status) for one synthetic employee over ``days`` days from ``start``.
+
+    Sundays are holidays. Each employee has their own absence rate, one in ten
+    is absent twice as often on Mondays, leave comes in short runs and a few
+    days are never marked.
+    """
+    absence = rng.betavariate(2, 30)
+    monday_absence = absence * 2 if rng.random() < 0.1 else absence
+    leave_left = 0
+    for offset in range(days):
+        day = start + timedelta(days=offset)
+        if day.weekday() == 6:
+            yield day, 'Holiday'
+            continue
+        if leave_left:
+            leave_left -= 1
+            yield day, 'Leave'
+            continue
+        roll = rng.random()
+        if roll < UNMARKED:
+            continue
+        if roll < UNMARKED + LEAVE_START:
+            leave_left = rng.randint(*LEAVE_DAYS) - 1
+            yield day, 'Leave'
+            continue
+        yield day, 'Absent' if rng.random() < (monday_absence if day.weekday() == 0 else absence) else 'Present'
+
+
+def create_owners(usernames, password):
+    """Create owner accounts in one insert, hashing the shared password once"""
+    hashed = make_password(password)
+    User.objects.bulk_create([User(username=username, password=hashed) for username in usernames])
+    return list(User.objects.filter(username__in=usernames).order_by('id'))
+
+
+def remove_owner(owner):
+    """Delete an owner account, clearing its data in chunks first"""
+    purge(owner.id)
+    owner.delete()
+
+
+def seed_owner(owner, employees, days, end, rng, batch_size=BATCH_SIZE):
+    """
+    Give ``owner`` synthetic employees with ``days`` days of attendance up to ``end``.
+
+    Rows go in with bulk inserts of ``batch_size``, bypassing the per-row
+    summary bookkeeping; summaries (and packed months) are rebuilt once at the
+    end. Returns the number of attendance rows written.
+    """
+    Employee.objects.bulk_create(
+        [
+            Employee(
+                owner=owner,
+                name=f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}',
+                emp_id=f'{owner.username}-{index:05d}',
+                role=rng.choice(ROLES),
+                salary=rng.randrange(15000, 90000, 500),
+            )
+            for index in range(1, employees + 1)
+        ],
+        batch_size=batch_size,
+    )
+    employee_ids = Employee.objects.filter(owner=owner).order_by('id').values_list('id', flat=True)
+
+    start = end - timedelta(days=days - 1)
+    written, batch = 0, []
+    for employee_id in employee_ids:
+        for day, status in employee_days(rng, start, days):
+            batch.append(Attendance(employee_id=employee_id, owner=owner, date=day, status=status))
+        if len(batch) >= batch_size:
+            Attendance.objects.bulk_create(batch, batch_size=batch_size)
+            written += len(batch)
+            batch = []
+    Attendance.objects.bulk_create(batch, batch_size=batch_size)
+    written += len(batch)
+
+    rebuild_owner(owner.id, start, end)
+    if settings.ATTENDANCE_STORAGE == 'packed':
+        pack_owner(owner.id, start, end)
+    return written
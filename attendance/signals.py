@@ -0,0 +1,46 @@
+from django.db import connections
+from django.db.migrations.recorder import MigrationRecorder
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from .models import Attendance, Employee, Job, MonthlyAttendanceSummary, OwnerDataVersion
+
+
+def _deleting_attendance_directly(origin):
+    if isinstance(origin, QuerySet):
+        return origin.model is Attendance
+    return isinstance(origin, Attendance)
+
+
+@receiver(post_delete, sender=Attendance)
+def refresh_summary_on_delete(sender, instance, origin=None, **kwargs):
+    """Recount the month a deleted attendance row belonged to"""
+    # Runs inside the deletion transaction. Cascades from Employee/User remove the
+    # summaries themselves, so only direct deletes need a recount.
+    if _deleting_attendance_directly(origin):
+        MonthlyAttendanceSummary.refresh([instance.employee_id], instance.date.year, instance.date.month)
+        OwnerDataVersion.bump(instance.owner_id)
+
+
+@receiver(post_delete, sender=Employee)
+def bump_version_on_employee_delete(sender, instance, **kwargs):
+    """Invalidate the owner's cached rosters and reports"""
+    OwnerDataVersion.bump(instance.owner_id)
+
+
+@receiver(post_delete, sender=Job)
+def delete_job_file(sender, instance, **kwargs):
+    """Remove the export file of a deleted job, including jobs deleted with their owner"""
+    from .jobs import delete_file
+    delete_file(instance)
+
+
+def ensure_search_index(sender, using='default', **kwargs):
+    """post_migrate: restore the SQLite search triggers a table rebuild dropped, or the PostgreSQL trigram indexes"""
+    from .search import ensure_fts_index, ensure_trigram_indexes
+    if ('attendance', '0008_employee_search_indexes') not in MigrationRecorder(connections[using]).applied_migrations():
+        # Migrated back past the migration that adds them
+        return
+    ensure_fts_index(using)
+    ensure_trigram_indexes(using)
@@ -0,0 +1,117 @@
+from datetime import date, timedelta
+
+from django.db import transaction
+from django.db.models import Count, Q
+from django.db.models.functions import ExtractMonth, ExtractYear
+
+from .models import Attendance, Employee, MonthlyAttendanceSummary, OwnerDataVersion
+
+
+STATUSES = [choice[0] for choice in Attendance.STATUS_CHOICES]
+COUNT_FIELDS = [status.lower() for status in STATUSES]
+
+
+def month_start(year, month):
+    return date(int(year), int(month), 1)
+
+
+def next_month_start(year, month):
+    year, month = int(year), int(month)
+    return date(year + 1, 1, 1) if month == 12 else date(year, month + 1, 1)
+
+
+def status_counts():
+    """Count(filter=...) aggregates for every status, keyed like COUNT_FIELDS"""
+    return {status.lower(): Count('id', filter=Q(status=status)) for status in STATUSES}
+
+
+def add_counts(counts, more):
+    """Add the per-status counts in ``more`` to ``counts`` in place"""
+    for field in COUNT_FIELDS:
+        counts[field] = counts.get(field, 0) + more[field]
+    return counts
+
+
+def count_month(year, month, **filters):
+    """Count statuses per employee for one month from Attendance and the archive"""
+    from .archive import archived_counts
+    
+    start, end = month_start(year, month), next_month_start(year, month)
+    rows = (
+        Attendance.objects.filter(date__gte=start, date__lt=end, **filters)
+        .order_by()
+        .values('employee_id')
+        .annotate(**status_counts())
+    )
+    counts = {row.pop('employee_id'): row for row in rows}
+    for key, archived in archived_counts(start, end - timedelta(days=1), **filters).items():
+        add_counts(counts.setdefault(key[0], {}), archived)
+    return counts
+
+
+def count_range(start, end, **filters):
+    """Count statuses per (employee, year, month) for every month touched by start..end, archive included"""
+    from .archive import archived_counts
+    
+    first, last = month_start(start.year, start.month), next_month_start(end.year, end.month)
+    rows = (
+        Attendance.objects.filter(date__gte=first, date__lt=last, **filters)
+        .annotate(year=ExtractYear('date'), month=ExtractMonth('date'))
+        .order_by()
+        .values('employee_id', 'year', 'month')
+        .annotate(**status_counts())
+    )
+    counts = {(row.pop('employee_id'), row.pop('year'), row.pop('month')): row for row in rows}
+    for key, archived in archived_counts(first, last - timedelta(days=1), **filters).items():
+        add_counts(counts.setdefault(key, {}), archived)
+    return counts
+
+
+def months_filter(start, end):
+    """Q over (year, month) columns matching every month touched by start..end"""
+    months = Q()
+    for year in range(start.year, end.year + 1):
+        first = start.month if year == start.year else 1
+        last = end.month if year == end.year else 12
+        months |= Q(year=year, month__gte=first, month__lte=last)
+    return months
+
+
+def _stored_summaries(start, end, owner_id):
+    return MonthlyAttendanceSummary.objects.filter(owner_id=owner_id).filter(months_filter(start, end))
+
+
+def rebuild_owner(owner_id, start, end):
+    """Replace one owner's summaries for the months touched by start..end; returns the row count"""
+    counts = count_range(start, end, owner_id=owner_id)
+    summaries = [
+        MonthlyAttendanceSummary(owner_id=owner_id, employee_id=employee_id, year=year, month=month, **row)
+        for (employee_id, year, month), row in counts.items()
+    ]
+    with transaction.atomic():
+        _stored_summaries(start, end, owner_id).delete()
+        MonthlyAttendanceSummary.objects.bulk_create(summaries, batch_size=1000)
+        OwnerDataVersion.bump(owner_id)
+    return len(summaries)
+
+
+def verify_owner(owner_id, start, end):
+    """Compare one owner's stored summaries against Attendance; returns a list of mismatch descriptions"""
+    expected = count_range(start, end, owner_id=owner_id)
+    stored = {
+        (row.pop('employee_id'), row.pop('year'), row.pop('month')): row
+        for row in _stored_summaries(start, end, owner_id).values('employee_id', 'year', 'month', *COUNT_FIELDS)
+    }
+    empty = dict.fromkeys(COUNT_FIELDS, 0)
+    mismatches = []
+    for key in sorted(expected.keys() | stored.keys()):
+        if expected.get(key, empty) != stored.get(key, empty):
+            employee_id, year, month = key
+            mismatches.append(
+                f"employee {employee_id} {year}/{month:02d}: expected {expected.get(key, empty)}, stored {stored.get(key)}"
+            )
+    return mismatches
+
+
+def owner_ids():
+    return list(Employee.objects.order_by().values_list('owner_id', flat=True).distinct())
@@ -0,0 +1,190 @@
+import io
+from datetime import date, timedelta
+from unittest import mock, skipUnless
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase
+
+from .archive import archive_owner
+from .imports import ImportAborted, import_csv
+from .management.commands.explain_queries import FULL_SCAN_MARKERS, hot_queries
+from .models import ArchivedAttendance, Attendance, Employee, MonthlyAttendanceSummary
+from .search import has_trigrams, search_employees
+
+
+# The index each hot query in explain_queries.hot_queries() should be planned on
+EXPECTED_INDEXES = {
+    'mark_attendance day lookup': 'attendance_owner_date_idx',
+    'employee_detail month': 'attendance_attendance_employee_id_date_cb2c479f_uniq',
+    'range export': 'attendance_owner_date_idx',
+    'daily status count': 'attendance_date_status_idx',
+    'monthly report': 'summary_owner_month_idx',
+    'roster': 'employee_owner_name_idx',
+}
+
+
+class HotQueryPlanTests(TestCase):
+    """EXPLAIN the hot attendance queries and check they read through their indexes"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.day = date(2026, 3, 15)
+        cls.owner = User.objects.create_user('planner')
+        other = User.objects.create_user('other')
+        employees = Employee.objects.bulk_create([
+            Employee(owner=owner, name=f'Employee {i}', emp_id=f'{owner.username}-{i}', role='Staff', salary=30000)
+            for owner in (cls.owner, other) for i in range(5)
+        ])
+        Attendance.objects.bulk_create([
+            Attendance(employee=employee, owner=employee.owner, date=cls.day - timedelta(days=n), status='Present')
+            for employee in employees for n in range(20)
+        ])
+        MonthlyAttendanceSummary.refresh([employee.id for employee in employees], cls.day.year, cls.day.month)
+        cls.employee = employees[0]
+
+    def setUp(self):
+        if connection.vendor == 'postgresql':
+            # A handful of rows is cheaper to scan; ask for the plan the planner uses on real tables
+            with connection.cursor() as cursor:
+                cursor.execute('SET enable_seqscan = off')
+
+    def test_hot_queries_use_their_index(self):
+        markers = FULL_SCAN_MARKERS.get(connection.vendor, [])
+        queries = hot_queries(self.owner, self.employee, self.day)
+        self.assertEqual({label for label, queryset in queries}, set(EXPECTED_INDEXES))
+        for label, queryset in queries:
+            with self.subTest(label):
+                plan = queryset.explain()
+                self.assertIn(EXPECTED_INDEXES[label], plan)
+                self.assertFalse([marker for marker in markers if marker in plan], plan)
+
+
+class ArchivedMonthWriteTests(TestCase):
+    """Saving a row into an archived month moves the month back without duplicating the saved day"""
+
+    @classmethod
+    def setUpTestData(cls):
+        owner = User.objects.create_user('archiver')
+        cls.employee = Employee.objects.create(owner=owner, name='Archived', emp_id='A-1', role='Staff', salary=30000)
+        for day in (1, 2, 3):
+            Attendance.objects.create(employee=cls.employee, date=date(2025, 1, day), status='Present')
+        archive_owner(owner.id, date(2025, 2, 1))
+
+    def assertMonth(self, statuses):
+        rows = Attendance.objects.filter(employee=self.employee).order_by('date')
+        self.assertEqual({row.date.day: row.status for row in rows}, statuses)
+        self.assertFalse(ArchivedAttendance.objects.filter(employee=self.employee).exists())
+        summary = MonthlyAttendanceSummary.objects.get(employee=self.employee, year=2025, month=1)
+        marked = list(statuses.values())
+        self.assertEqual((summary.present, summary.absent), (marked.count('Present'), marked.count('Absent')))
+
+    def test_create_new_day(self):
+        Attendance.objects.create(employee=self.employee, date=date(2025, 1, 4), status='Absent')
+        self.assertMonth({1: 'Present', 2: 'Present', 3: 'Present', 4: 'Absent'})
+
+    def test_create_archived_day(self):
+        Attendance.objects.create(employee=self.employee, date=date(2025, 1, 2), status='Absent')
+        self.assertMonth({1: 'Present', 2: 'Absent', 3: 'Present'})
+
+    def test_move_row_onto_archived_day(self):
+        row = Attendance.objects.create(employee=self.employee, date=date(2025, 2, 1), status='Absent')
+        row.date = date(2025, 1, 3)
+        row.save()
+        self.assertMonth({1: 'Present', 2: 'Present', 3: 'Absent'})
+
+
+class EmployeeSearchTests(TestCase):
+    """Prefix and typo-tolerant employee search on the database's own trigram index"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user('searcher')
+        other = User.objects.create_user('neighbour')
+        names = [(cls.owner, 'Arjun Menon'), (cls.owner, 'Vikram Reddy'), (cls.owner, 'Pooja Sharma'),
+                 (cls.owner, 'Ravi Das'), (other, 'Arjun Menon')]
+        Employee.objects.bulk_create([
+            Employee(owner=owner, name=name, emp_id=f'E-{i}', role='Staff', salary=30000)
+            for i, (owner, name) in enumerate(names, 1)
+        ])
+
+    def names(self, query):
+        return [result['name'] for result in search_employees(self.owner, query)]
+
+    def test_prefix(self):
+        self.assertEqual(self.names('vik'), ['Vikram Reddy'])
+        self.assertEqual(self.names('e-3')[:1], ['Pooja Sharma'])
+
+    def test_single_word_typo(self):
+        if connection.vendor == 'postgresql' and not has_trigrams(connection):
+            self.skipTest('pg_trgm is not installed')
+        for query, name in [('Arjn', 'Arjun Menon'), ('Vikrm', 'Vikram Reddy'), ('Poja', 'Pooja Sharma'),
+                            ('Shrma', 'Pooja Sharma'), ('Pooja Shrma', 'Pooja Sharma')]:
+            with self.subTest(query):
+                self.assertEqual(self.names(query)[:1], [name])
+
+    def test_other_owners_excluded(self):
+        self.assertEqual(self.names('Arjun'), ['Arjun Menon'])
+
+    @skipUnless(connection.vendor == 'postgresql', 'substring fallback for PostgreSQL without pg_trgm')
+    def test_without_pg_trgm(self):
+        with mock.patch('attendance.search.has_trigrams', return_value=False):
+            self.assertEqual(self.names('sharma'), ['Pooja Sharma'])
+            self.assertEqual(self.names('e-3'), ['Pooja Sharma'])
+            self.assertEqual(self.names('Poja'), [])
+
+
+class MarkAttendanceFormTests(TestCase):
+    """The mark attendance form skips employee fields that cannot name an employee"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user('marker')
+        cls.employee = Employee.objects.create(owner=cls.owner, name='Marked', emp_id='M-1', role='Staff', salary=30000)
+
+    def test_out_of_range_ids_are_skipped(self):
+        self.client.force_login(self.owner)
+        response = self.client.post('/attendance/', {
+            'date': '2026-03-02',
+            f'employee_{self.employee.id}': 'Present',
+            f'employee_{2 ** 63}': 'Present',
+            'employee_99999999999999999999999': 'Absent',
+            'employee_\u00b2': 'Absent',
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(list(Attendance.objects.values_list('employee_id', 'status')), [(self.employee.id, 'Present')])
+
+
+class ImportAbortTests(TestCase):
+    """An import that stops partway says which lines were already committed"""
+
+    def test_invalid_utf8_after_some_batches(self):
+        owner = User.objects.create_user('importer')
+        rows = ''.join(f'Employee {i},IMP-{i},Staff,30000\n' for i in range(1000))
+        upload = io.BytesIO(b'name,emp_id,role,salary\n' + rows.encode() + b'Bad \xff,IMP-X,Staff,30000\n')
+        with self.assertRaises(ImportAborted) as raised:
+            import_csv(owner, io.TextIOWrapper(upload, encoding='utf-8', newline=''), 'employees', batch_size=100)
+        report = raised.exception.report
+        self.assertGreater(report.saved, 0)
+        self.assertEqual(Employee.objects.filter(owner=owner).count(), report.saved)
+        self.assertIn(f'import the file again from line {report.processed + 2}', str(raised.exception))
+
+
+class OwnerConditionTests(TestCase):
+    """ETag and Last-Modified go on report pages, never on redirects"""
+
+    def setUp(self):
+        self.client.force_login(User.objects.create_user('conditional'))
+
+    def test_page_has_validators(self):
+        response = self.client.get('/report/range/')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.has_header('ETag'))
+        self.assertTrue(response.has_header('Last-Modified'))
+        self.assertEqual(self.client.get('/report/range/', HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+    def test_redirect_has_no_validators(self):
+        response = self.client.get('/report/range/?start=not-a-date')
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(response.has_header('ETag'))
+        self.assertFalse(response.has_header('Last-Modified'))
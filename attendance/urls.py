@@ -1,5 +1,9 @@
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import api, async_views, views
+
+# Under ASGI the report and download views run as coroutines so slow reports and large files don't hold a worker
+reports = async_views if settings.ASYNC_VIEWS else views
 
 urlpatterns = [
     path('', views.dashboard, name='dashboard'),
@@ -7,8 +11,24 @@ urlpatterns = [
     path('login/', views.login_view, name='login'),
     path('logout/', views.logout_view, name='logout'),
     path('debug/', views.debug_view, name='debug'),
+    path('import/', views.import_data, name='import_data'),
     path('attendance/', views.mark_attendance, name='mark_attendance'),
-    path('report/', views.attendance_report, name='attendance_report'),
-    path('employee/<int:employee_id>/', views.employee_detail, name='employee_detail'),
-    path('export/', views.export_report, name='export_report'),
+    path('attendance/grid/', views.attendance_grid, name='attendance_grid'),
+    path('attendance/grid/save/', views.save_attendance_grid, name='save_attendance_grid'),
+    path('report/', reports.attendance_report, name='attendance_report'),
+    path('report/range/', views.range_report, name='range_report'),
+    path('employee/<int:employee_id>/', reports.employee_detail, name='employee_detail'),
+    path('employee/search/', views.employee_search, name='employee_search'),
+    path('export/', reports.export_report, name='export_report'),
+    path('analytics/', views.analytics_report, name='analytics_report'),
+    path('analytics/data/', views.analytics_data, name='analytics_data'),
+    path('jobs/', views.jobs, name='jobs'),
+    path('jobs/<int:job_id>/', views.job_status, name='job_status'),
+    path('jobs/<int:job_id>/download/', reports.job_download, name='job_download'),
+    path('payroll/', views.payroll, name='payroll'),
+    path('payroll/<int:run_id>/', views.payroll_run, name='payroll_run'),
+    path('payroll/<int:run_id>/export/', reports.payroll_export, name='payroll_export'),
+    path('events/', async_views.attendance_events, name='attendance_events'),
+    path('api/attendance/', api.attendance_batch, name='api_attendance_batch'),
+    path('metrics/', views.metrics, name='metrics'),
 ]
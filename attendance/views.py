@@ -2,15 +2,37 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth import login, logout
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.http import JsonResponse, HttpResponse
-from django.db.models import Q, Count
+from django.conf import settings
+from django.http import FileResponse, Http404, JsonResponse, HttpResponse, StreamingHttpResponse
+from django.urls import reverse
 from django.utils import timezone
-from datetime import datetime, date
+from django.views.decorators.cache import cache_control
+from django.views.decorators.gzip import gzip_page
+from django.views.decorators.http import require_GET, require_POST
+from datetime import datetime, timedelta
+from urllib.parse import urlencode
 import csv
+import hmac
+import io
 import json
 
-from .models import Employee, Attendance, UserProfile
-from .forms import CustomUserCreationForm, EmployeeForm, AttendanceForm
+from .models import Employee, Attendance, Job, PayrollRun, UserProfile
+from .forms import EmployeeForm
+from .analytics import MAX_DAYS, analyze, default_range
+from .archive import archived_records
+from .caching import get_or_build, owner_condition
+from .events import day_counts, last_event_id
+from .exports import LAYOUTS, pivot_rows, stream_csv
+from .grid import day_statuses, grid_payload, is_db_id, parse_changes
+from .imports import import_csv
+from .jobs import clean_params as clean_job_params, run_now as run_job_now, submit as submit_job
+from .marking import parse_day, upsert_attendance
+from .metrics import registry
+from .pagination import KeysetPage, keyset_paginate, page_size, page_urls
+from .payroll import run_payroll, stream_payroll_csv
+from .search import search_employees
+from .reporting import MAX_PIVOT_MONTHS, monthly_summary, build_chart_data, range_months, range_pivot
+from .summaries import month_start, next_month_start
 
 
 def register_view(request):
@@ -98,9 +120,46 @@ def debug_view(request):
     })
 
 
+# Browsers keep the page but must ask before reusing it, which lets condition() answer 304
+revalidate = cache_control(private=True, no_cache=True)
+
+
+def roster_page(request):
+    """One keyset page of the owner's employees, filtered by ?role= and a ?q= name prefix"""
+    owner = request.user
+    role = request.GET.get('role', '').strip()
+    prefix = request.GET.get('q', '').strip()
+    after, before = request.GET.get('after'), request.GET.get('before')
+    size = page_size(request)
+    
+    def build():
+        employees = Employee.objects.filter(owner=owner)
+        if role:
+            employees = employees.filter(role=role)
+        if prefix:
+            employees = employees.filter(name__istartswith=prefix)
+        return keyset_paginate(employees, ['name', 'id'], after, before, size)
+    
+    page = get_or_build(owner, 'roster', build, role, prefix, after, before, size)
+    return page, {
+        'role': role,
+        'q': prefix,
+        'size': size,
+        'page_size_options': sorted({25, 50, 100, 200, size}),
+        **page_urls(request, page),
+    }
+
+
+def employee_count(owner):
+    return get_or_build(owner, 'employee_count', lambda: Employee.objects.filter(owner=owner).count())
+
+
+def cached_monthly_summary(owner, year, month):
+    return get_or_build(owner, 'monthly', lambda: monthly_summary(owner, year, month), int(year), int(month))
+
+
 @login_required
 def dashboard(request):
-    employees = Employee.objects.filter(owner=request.user)
     if request.method == 'POST':
         form = EmployeeForm(request.POST)
         if form.is_valid():
@@ -112,17 +171,85 @@ def dashboard(request):
     else:
         form = EmployeeForm()
     
+    # Read before the counts, so live updates resend anything written in between
+    event_id = last_event_id(request.user)
+    today = timezone.now().date()
+    today_counts = get_or_build(request.user, 'day_counts', lambda: day_counts(request.user, today), today.isoformat())
+    employees, paging = roster_page(request)
     context = {
         'employees': employees,
+        'employee_count': employee_count(request.user),
+        'today': today_counts,
+        'today_marked': sum(today_counts.values()),
+        'last_event_id': event_id,
         'form': form,
+        **paging,
     }
     return render(request, 'dashboard.html', context)
 
 
+@login_required
+def import_data(request):
+    if request.method != 'POST':
+        return redirect('dashboard')
+    
+    upload = request.FILES.get('file')
+    kind = request.POST.get('kind', 'employees')
+    if not upload:
+        messages.error(request, 'Please choose a CSV file to import.')
+        return redirect('dashboard')
+    
+    try:
+        csv_file = io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline='')
+        report = import_csv(request.user, csv_file, kind)
+    except (UnicodeDecodeError, ValueError) as e:
+        messages.error(request, f'Import failed: {str(e)}')
+        return redirect('dashboard')
+    
+    for error in report.errors[:10]:
+        messages.warning(request, error)
+    if report.error_count > 10:
+        messages.warning(request, f'... and {report.error_count - 10} more rows were skipped.')
+    messages.success(request, f'Imported {report.saved} of {report.processed} rows.')
+    return redirect('dashboard')
+
+
+@login_required
+def employee_search(request):
+    """JSON autocomplete over the owner's employee names and IDs"""
+    try:
+        limit = max(1, min(int(request.GET.get('limit', 10)), 25))
+    except ValueError:
+        limit = 10
+    results = search_employees(request.user, request.GET.get('q', ''), limit)
+    for result in results:
+        result['url'] = reverse('employee_detail', args=[result['id']])
+    return JsonResponse({'results': results})
+
+
+def redirect_back(request):
+    """Return to the mark attendance page (date, filters and page) the form was posted from"""
+    query = request.POST.get('return_query', '')
+    if not query:
+        return redirect('mark_attendance')
+    return redirect(f"{reverse('mark_attendance')}?{query}")
+
+
+def posted_statuses(post):
+    """(employee_id, status) from the form's employee_<id> fields, skipping malformed and out-of-range ids"""
+    for key, status in post.items():
+        employee_id = key[len('employee_'):]
+        if key.startswith('employee_') and employee_id.isdecimal() and status and is_db_id(int(employee_id)):
+            yield int(employee_id), status
+
+
 @login_required
 def mark_attendance(request):
     employees = Employee.objects.filter(owner=request.user)
-    selected_date = request.GET.get('date', timezone.now().date())
+    try:
+        selected_date = parse_day(request.GET.get('date') or timezone.now().date())
+    except ValueError:
+        selected_date = timezone.now().date()
     
     if request.method == 'POST':
         date = request.POST.get('date')
@@ -130,162 +257,431 @@ def mark_attendance(request):
             messages.error(request, 'Please select a date.')
             return redirect('mark_attendance')
         
-        # Get existing attendance for the date
-        existing_attendance = {att.employee.id: att for att in Attendance.objects.filter(date=date, employee__owner=request.user)}
+        try:
+            parse_day(date)
+        except ValueError:
+            messages.error(request, f'Invalid date: {date}')
+            return redirect('mark_attendance')
+        
+        records = [
+            {'employee_id': employee_id, 'date': date, 'status': status}
+            for employee_id, status in posted_statuses(request.POST)
+        ]
         
-        for employee in employees:
-            status = request.POST.get(f'employee_{employee.id}')
-            if status:
-                try:
-                    attendance, created = Attendance.objects.get_or_create(
-                        employee=employee,
-                        date=date,
-                        defaults={'status': status}
-                    )
-                    if not created:
-                        attendance.status = status
-                        attendance.save()
-                except Exception as e:
-                    messages.error(request, f'Error saving attendance for {employee.name}: {str(e)}')
-                    continue
+        saved, errors = upsert_attendance(request.user, records)
+        if errors:
+            names = dict(employees.filter(id__in=[error[1] for error in errors]).values_list('id', 'name'))
+            for index, employee_id, error in errors:
+                messages.error(request, f'Error saving attendance for {names.get(employee_id, employee_id)}: {error}')
+        if not saved:
+            return redirect_back(request)
         
         messages.success(request, f'Attendance marked successfully for {date}!')
-        return redirect('mark_attendance')
+        return redirect_back(request)
+    
+    if request.GET.get('mode') == 'grid':
+        # The browser fetches the rows from attendance_grid and renders them itself
+        return render(request, 'mark_attendance_grid.html', {
+            'selected_date': selected_date,
+            'role': request.GET.get('role', '').strip(),
+            'q': request.GET.get('q', '').strip(),
+        })
+    
+    page, paging = roster_page(request)
     
-    # Get attendance for selected date
-    attendance_data = {}
-    if selected_date:
-        attendance_records = Attendance.objects.filter(date=selected_date, employee__owner=request.user)
-        attendance_data = {att.employee.id: att.status for att in attendance_records}
+    # Get attendance for the employees on this page
+    employee_ids = [employee.id for employee in page]
+    attendance_data = get_or_build(
+        request.user, 'day',
+        lambda: day_statuses(request.user, selected_date, employee_ids),
+        selected_date.isoformat(), employee_ids,
+    )
     
     context = {
-        'employees': employees,
+        'employees': page,
         'selected_date': selected_date,
         'attendance_data': attendance_data,
+        'return_query': request.GET.urlencode(),
+        **paging,
     }
     return render(request, 'clean_mark_attendance.html', context)
 
 
 @login_required
+@require_GET
+@gzip_page
+@revalidate
+@owner_condition
+def attendance_grid(request):
+    """One day of attendance for the whole (?role=, ?q= filtered) roster as compact columnar JSON"""
+    try:
+        selected_date = parse_day(request.GET.get('date') or timezone.now().date())
+    except ValueError:
+        return JsonResponse({'error': 'Invalid date.'}, status=400)
+    role, prefix = request.GET.get('role', '').strip(), request.GET.get('q', '').strip()
+    # Cached as the encoded body, which is what every hit needs
+    body = get_or_build(
+        request.user, 'grid',
+        lambda: json.dumps(grid_payload(request.user, selected_date, role, prefix), separators=(',', ':')),
+        selected_date.isoformat(), role, prefix,
+    )
+    return HttpResponse(body, content_type='application/json')
+
+
+@login_required
+@require_POST
+def save_attendance_grid(request):
+    """Save the grid cells that changed: ``{"date": "YYYY-MM-DD", "ids": [...], "codes": [...]}``"""
+    try:
+        payload = json.loads(request.body)
+    except (UnicodeDecodeError, ValueError):
+        return JsonResponse({'error': 'Request body must be JSON.'}, status=400)
+    try:
+        records = parse_changes(payload)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    saved, errors = upsert_attendance(request.user, records)
+    return JsonResponse({
+        'saved': saved,
+        'errors': [{'employee_id': employee_id, 'error': error} for index, employee_id, error in errors],
+    })
+
+
+@login_required
+@revalidate
+@owner_condition
 def attendance_report(request):
     month = request.GET.get('month', timezone.now().month)
     year = request.GET.get('year', timezone.now().year)
     
-    # Get all employees
-    employees = Employee.objects.filter(owner=request.user)
-    
-    # Calculate attendance summary
-    summary_data = []
-    for employee in employees:
-        # Get attendance records for the month
-        attendance_records = Attendance.objects.filter(
-            employee=employee,
-            date__year=year,
-            date__month=month
-        )
-        
-        # Count statuses
-        status_counts = attendance_records.values('status').annotate(count=Count('status'))
-        status_dict = {item['status']: item['count'] for item in status_counts}
-        
-        present = status_dict.get('Present', 0)
-        absent = status_dict.get('Absent', 0)
-        leave = status_dict.get('Leave', 0)
-        holiday = status_dict.get('Holiday', 0)
-        
-        total_days = present + absent + leave + holiday
-        percentage = (present / total_days * 100) if total_days > 0 else 0
-        
-        summary_data.append({
-            'employee': employee,
-            'present': present,
-            'absent': absent,
-            'leave': leave,
-            'holiday': holiday,
-            'total_days': total_days,
-            'percentage': round(percentage, 2)
-        })
-    
-    # Prepare chart data
-    chart_data = {
-        'labels': [emp['employee'].name for emp in summary_data],
-        'present': [emp['present'] for emp in summary_data],
-        'absent': [emp['absent'] for emp in summary_data],
-        'leave': [emp['leave'] for emp in summary_data],
-    }
+    # Read before the data, so live updates resend anything written in between
+    event_id = last_event_id(request.user)
+    summary_data = cached_monthly_summary(request.user, year, month)
+    chart_data = build_chart_data(summary_data)
     
     context = {
         'summary_data': summary_data,
+        'last_event_id': event_id,
         'chart_data': json.dumps(chart_data),
         'month': int(month),
         'year': int(year),
+        'background_jobs': settings.ATTENDANCE_BACKGROUND_JOBS,
     }
     return render(request, 'clean_attendance_report.html', context)
 
 
+def detail_page(employee, year, month, after, before, size):
+    """One page of an employee's month; an archived month comes back whole as a single page"""
+    archived = archived_records(employee, year, month)
+    if archived is not None:
+        return KeysetPage(archived, ['date'], has_next=False, has_previous=False)
+    return keyset_paginate(
+        Attendance.objects.filter(
+            employee=employee,
+            date__gte=month_start(year, month),
+            date__lt=next_month_start(year, month)
+        ),
+        ['date', 'id'], after, before, size,
+    )
+
+
 @login_required
+@revalidate
+@owner_condition
 def employee_detail(request, employee_id):
     employee = get_object_or_404(Employee, id=employee_id, owner=request.user)
     month = request.GET.get('month', timezone.now().month)
     year = request.GET.get('year', timezone.now().year)
     
-    # Get attendance records for the month
-    attendance_records = Attendance.objects.filter(
-        employee=employee,
-        date__year=year,
-        date__month=month
-    ).order_by('date')
+    after, before = request.GET.get('after'), request.GET.get('before')
+    size = page_size(request)
+    
+    # Get attendance records for the month, one page at a time
+    attendance_records = get_or_build(
+        request.user, 'detail',
+        lambda: detail_page(employee, year, month, after, before, size),
+        employee.id, int(year), int(month), after, before, size,
+    )
     
     context = {
         'employee': employee,
         'attendance_records': attendance_records,
         'month': int(month),
         'year': int(year),
+        **page_urls(request, attendance_records),
     }
     return render(request, 'employee_detail.html', context)
 
 
 @login_required
+@revalidate
+@owner_condition
 def export_report(request):
+    if request.GET.get('start') or request.GET.get('end'):
+        return export_range(request)
+    
     month = request.GET.get('month', timezone.now().month)
     year = request.GET.get('year', timezone.now().year)
     
-    # Get all employees
-    employees = Employee.objects.filter(owner=request.user)
-    
     response = HttpResponse(content_type='text/csv')
     response['Content-Disposition'] = f'attachment; filename="attendance_report_{year}_{month}.csv"'
     
     writer = csv.writer(response)
     writer.writerow(['Employee Name', 'Employee ID', 'Present Days', 'Absent Days', 'Leave Days', 'Holiday Days', 'Total Days', 'Attendance %'])
     
-    for employee in employees:
-        attendance_records = Attendance.objects.filter(
-            employee=employee,
-            date__year=year,
-            date__month=month
-        )
-        
-        status_counts = attendance_records.values('status').annotate(count=Count('status'))
-        status_dict = {item['status']: item['count'] for item in status_counts}
-        
-        present = status_dict.get('Present', 0)
-        absent = status_dict.get('Absent', 0)
-        leave = status_dict.get('Leave', 0)
-        holiday = status_dict.get('Holiday', 0)
-        
-        total_days = present + absent + leave + holiday
-        percentage = (present / total_days * 100) if total_days > 0 else 0
-        
+    for row in cached_monthly_summary(request.user, year, month):
+        employee = row['employee']
         writer.writerow([
             employee.name,
             employee.emp_id,
-            present,
-            absent,
-            leave,
-            holiday,
-            total_days,
-            f"{percentage:.2f}%"
+            row['present'],
+            row['absent'],
+            row['leave'],
+            row['holiday'],
+            row['total_days'],
+            f"{row['percentage']:.2f}%"
         ])
     
     return response
+
+
+@login_required
+@revalidate
+@owner_condition
+def range_report(request):
+    """Employee x month pivot for any date range, as a page or with ?format=csv / ?format=json"""
+    today = timezone.now().date()
+    try:
+        start = parse_day(request.GET.get('start') or today.replace(month=1, day=1))
+        end = parse_day(request.GET.get('end') or today)
+    except ValueError:
+        messages.error(request, 'Please select a valid start and end date.')
+        return redirect('range_report')
+    if start > end or len(range_months(start, end)) > MAX_PIVOT_MONTHS:
+        messages.error(request, f'Please select a range of at most {MAX_PIVOT_MONTHS} months.')
+        return redirect('range_report')
+    
+    pivot = get_or_build(request.user, 'pivot', lambda: range_pivot(request.user, start, end), start.isoformat(), end.isoformat())
+    
+    output = request.GET.get('format')
+    if output == 'json':
+        return JsonResponse(pivot)
+    if output == 'csv':
+        response = HttpResponse(content_type='text/csv')
+        response['Content-Disposition'] = f'attachment; filename="attendance_pivot_{start}_{end}.csv"'
+        csv.writer(response).writerows(pivot_rows(pivot))
+        return response
+    
+    return render(request, 'range_report.html', {'pivot': pivot, 'start': start, 'end': end})
+
+
+def export_range_params(request):
+    """(start, end, layout) from the export form, or None after flashing an error"""
+    layout = request.GET.get('layout', 'daily')
+    try:
+        start = parse_day(request.GET.get('start'))
+        end = parse_day(request.GET.get('end'))
+    except ValueError:
+        messages.error(request, 'Please select a valid start and end date for the export.')
+        return None
+    if start > end or layout not in LAYOUTS:
+        messages.error(request, 'Please select a valid date range and layout for the export.')
+        return None
+    return start, end, layout
+
+
+def export_range(request):
+    """Stream a daily or summary CSV for an arbitrary date range"""
+    params = export_range_params(request)
+    if params is None:
+        return redirect('attendance_report')
+    start, end, layout = params
+    
+    response = StreamingHttpResponse(stream_csv(request.user, start, end, layout), content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="attendance_{layout}_{start}_{end}.csv"'
+    return response
+
+
+def analytics_params(request):
+    """(start, end, window) from the query string; raises ValueError with a user-facing message"""
+    start, end = default_range(timezone.now().date())
+    try:
+        if request.GET.get('start') or request.GET.get('end'):
+            start = parse_day(request.GET.get('start'))
+            end = parse_day(request.GET.get('end'))
+        window = int(request.GET.get('window', 30))
+    except (TypeError, ValueError):
+        raise ValueError('Please select a valid date range and rolling window.')
+    if start > end or (end - start).days >= MAX_DAYS:
+        raise ValueError(f'Please select a range of at most {MAX_DAYS} days.')
+    if not 7 <= window <= 90:
+        raise ValueError('The rolling window must be between 7 and 90 days.')
+    return start, end, window
+
+
+def cached_analytics(owner, start, end, window):
+    return get_or_build(owner, 'analytics', lambda: analyze(owner, start, end, window), start.isoformat(), end.isoformat(), window)
+
+
+@login_required
+@revalidate
+@owner_condition
+def analytics_report(request):
+    try:
+        start, end, window = analytics_params(request)
+    except ValueError as e:
+        messages.error(request, str(e))
+        return redirect('analytics_report')
+    
+    data = cached_analytics(request.user, start, end, window)
+    employees = data['employees']
+    chart_data = {
+        'months': [row['month'] for row in data['trend']],
+        'present_rate': [row['present_rate'] for row in data['trend']],
+        'absence_rate': [row['absence_rate'] for row in data['trend']],
+        'weekdays': list(data['weekday_absence_rate']),
+        'weekday_absence_rate': list(data['weekday_absence_rate'].values()),
+        'dates': data['dates'],
+        'roles': [
+            {'role': role['role'], 'rolling': role['rolling_absence_rate']}
+            for role in sorted(data['roles'], key=lambda role: -role['employees'])[:8]
+        ],
+    }
+    
+    context = {
+        'start': start,
+        'end': end,
+        'window': window,
+        'roles': data['roles'],
+        'most_absent': sorted(employees, key=lambda row: -row['absence_rate'])[:20],
+        'longest_streaks': sorted(employees, key=lambda row: -row['longest_absence_streak'])[:10],
+        'monday_effect': [row for row in employees if row['monday_effect']],
+        'chart_data': json.dumps(chart_data),
+    }
+    return render(request, 'analytics.html', context)
+
+
+@login_required
+@revalidate
+@owner_condition
+def analytics_data(request):
+    """The analytics report as JSON (?start=&end=&window=)"""
+    try:
+        start, end, window = analytics_params(request)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    return JsonResponse(cached_analytics(request.user, start, end, window))
+
+
+def job_payload(job):
+    return {
+        'id': job.id,
+        'kind': job.get_kind_display(),
+        'status': job.status,
+        'message': job.message,
+        'finished': job.is_finished,
+        'download_url': reverse('job_download', args=[job.id]) if job.result_file else None,
+    }
+
+
+@login_required
+def jobs(request):
+    """Queue a background job (POST) or list the owner's recent jobs"""
+    if request.method == 'POST':
+        if not settings.ATTENDANCE_BACKGROUND_JOBS:
+            return run_job_in_request(request)
+        try:
+            job = submit_job(request.user, request.POST.get('kind'), request.POST)
+        except ValueError as e:
+            messages.error(request, str(e))
+            return redirect('attendance_report')
+        messages.success(request, f'{job.get_kind_display()} queued. This page updates when it finishes.')
+        return redirect('jobs')
+    
+    recent = Job.objects.filter(owner=request.user)[:50]
+    return render(request, 'jobs.html', {'jobs': recent})
+
+
+def run_job_in_request(request):
+    """Without a worker: stream an export from export_report, or recalculate in this request"""
+    kind = request.POST.get('kind')
+    try:
+        params = clean_job_params(kind, request.POST)
+    except ValueError as e:
+        messages.error(request, str(e))
+        return redirect('attendance_report')
+    if kind == 'export':
+        return redirect(f"{reverse('export_report')}?{urlencode(params)}")
+    messages.success(request, run_job_now(request.user, kind, params))
+    return redirect(f"{reverse('attendance_report')}?{urlencode(params)}")
+
+
+@login_required
+@require_GET
+def job_status(request, job_id):
+    job = get_object_or_404(Job, id=job_id, owner=request.user)
+    return JsonResponse(job_payload(job))
+
+
+@login_required
+@require_GET
+def job_download(request, job_id):
+    job = get_object_or_404(Job, id=job_id, owner=request.user, status='Done')
+    if not job.result_file:
+        raise Http404('This job has no file.')
+    try:
+        result = job.result_file.open('rb')
+    except FileNotFoundError:
+        raise Http404('The export file is no longer available.')
+    return FileResponse(result, as_attachment=True, filename=job.result_file.name.rsplit('/', 1)[-1])
+
+
+@login_required
+def payroll(request):
+    """Calculate a month's payroll (POST) or list the owner's payroll runs"""
+    if request.method == 'POST':
+        try:
+            month_date = datetime.strptime(request.POST.get('month', ''), '%Y-%m').date()
+        except ValueError:
+            messages.error(request, 'Please select a month.')
+            return redirect('payroll')
+        run = run_payroll(
+            request.user, month_date.year, month_date.month,
+            paid_leave='paid_leave' in request.POST, paid_holiday='paid_holiday' in request.POST,
+        )
+        messages.success(request, f'Payroll for {month_date:%B %Y} calculated for {run.employee_count} employees.')
+        return redirect('payroll_run', run.id)
+    
+    # Default to last month, the one usually being paid
+    today = timezone.now().date()
+    last_month = (today.replace(day=1) - timedelta(days=1)).strftime('%Y-%m')
+    runs = PayrollRun.objects.filter(owner=request.user)[:50]
+    return render(request, 'payroll.html', {'runs': runs, 'default_month': last_month})
+
+
+@login_required
+def payroll_run(request, run_id):
+    run = get_object_or_404(PayrollRun, id=run_id, owner=request.user)
+    lines = keyset_paginate(
+        run.lines.all(), ['name', 'id'], request.GET.get('after'), request.GET.get('before'), page_size(request),
+    )
+    return render(request, 'payroll_run.html', {'run': run, 'lines': lines, **page_urls(request, lines)})
+
+
+@login_required
+@require_GET
+def payroll_export(request, run_id):
+    run = get_object_or_404(PayrollRun, id=run_id, owner=request.user)
+    response = StreamingHttpResponse(stream_payroll_csv(run), content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="payroll_{run.year}_{run.month:02d}_{run.id}.csv"'
+    return response
+
+
+@require_GET
+def metrics(request):
+    """Request metrics of this process in the Prometheus text format, for staff or the metrics token"""
+    token = settings.ATTENDANCE_METRICS_TOKEN
+    bearer = request.headers.get('Authorization', '').removeprefix('Bearer ')
+    if not (request.user.is_staff or (token and hmac.compare_digest(bearer, token))):
+        return HttpResponse('Staff only', status=403, content_type='text/plain')
+    return HttpResponse(registry.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
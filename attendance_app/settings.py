@@ -32,19 +32,24 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
+    # Per-view latency and query metrics; after WhiteNoise so static files are not counted
+    'attendance.middleware.MetricsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    # Routes report reads to DATABASE_REPLICAS; a no-op without replicas
+    'attendance.middleware.ReplicaMiddleware',
 ]
 
 ROOT_URLCONF = 'attendance_app.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates that also times each render for the request metrics
+        'BACKEND': 'attendance.metrics.InstrumentedDjangoTemplates',
         'DIRS': [BASE_DIR / 'templates'],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -60,15 +65,97 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'attendance_app.wsgi.application'
 
+# Serve the report views as async views; set when running under ASGI (uvicorn workers)
+ASYNC_VIEWS = config('ASYNC_VIEWS', default=False, cast=bool)
+
 # Database
 DATABASES = {
     'default': dj_database_url.parse(
         config('DATABASE_URL', default=f"sqlite:///{BASE_DIR / 'db.sqlite3'}"),
-        conn_max_age=600,
+        # Persistent connections are per thread, and ASGI runs sync code in short-lived threads
+        conn_max_age=0 if ASYNC_VIEWS else 600,
         ssl_require=config('DB_SSL_REQUIRE', default=False, cast=bool)
     )
 }
 
+# Read replicas, as comma-separated database URLs. The views in ATTENDANCE_REPLICA_VIEWS
+# read attendance data from one of them; for ATTENDANCE_PRIMARY_PIN_SECONDS after a
+# user writes, their requests read from the primary instead.
+REPLICA_DATABASE_URLS = config('REPLICA_DATABASE_URLS', default='', cast=Csv())
+DATABASE_REPLICAS = []
+for index, url in enumerate(REPLICA_DATABASE_URLS, 1):
+    DATABASE_REPLICAS.append(f'replica{index}')
+    DATABASES[f'replica{index}'] = {
+        **dj_database_url.parse(url, conn_max_age=DATABASES['default']['CONN_MAX_AGE'], ssl_require=config('DB_SSL_REQUIRE', default=False, cast=bool)),
+        'TEST': {'MIRROR': 'default'},
+    }
+DATABASE_ROUTERS = ['attendance.routers.ReplicaRouter'] if DATABASE_REPLICAS else []
+ATTENDANCE_REPLICA_VIEWS = config(
+    'ATTENDANCE_REPLICA_VIEWS',
+    default='attendance_report,employee_detail,export_report,range_report,analytics_report,analytics_data',
+    cast=Csv(),
+)
+ATTENDANCE_PRIMARY_PIN_SECONDS = config('ATTENDANCE_PRIMARY_PIN_SECONDS', default=10, cast=int)
+
+# Cache
+# Any Django backend works (locmem, file-based, redis, memcached). Per-owner entries are
+# keyed by a data version stored in the database, so they stay correct across workers.
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default='attendance-app'),
+        'TIMEOUT': config('CACHE_TIMEOUT', default=600, cast=int),
+    }
+}
+
+# Rows per page on the dashboard, mark attendance and employee detail pages (?size= overrides, up to 500)
+ATTENDANCE_PAGE_SIZE = config('ATTENDANCE_PAGE_SIZE', default=50, cast=int)
+
+# 'rows' reads reports from Attendance and its monthly summaries. 'packed' also keeps
+# PackedMonthlyAttendance (two bits per day) current and reads reports from it; run
+# `manage.py pack_attendance` once after switching.
+ATTENDANCE_STORAGE = config('ATTENDANCE_STORAGE', default='rows')
+
+# `manage.py archive_attendance` moves attendance older than this month and the
+# ATTENDANCE_HOT_MONTHS before it into ArchivedAttendance; reports read both
+ATTENDANCE_HOT_MONTHS = config('ATTENDANCE_HOT_MONTHS', default=12, cast=int)
+
+# Queries slower than this many milliseconds are logged and counted in /metrics/
+ATTENDANCE_SLOW_QUERY_MS = config('ATTENDANCE_SLOW_QUERY_MS', default=500, cast=float)
+
+# Set to a directory to write cProfile dumps of a sample of requests there, e.g.
+# ATTENDANCE_PROFILE_SAMPLE=0.01 profiles one request in a hundred
+ATTENDANCE_PROFILE_DIR = config('ATTENDANCE_PROFILE_DIR', default='')
+ATTENDANCE_PROFILE_SAMPLE = config('ATTENDANCE_PROFILE_SAMPLE', default=0.01, cast=float)
+
+# /metrics/ is open to staff users, and to scrapers sending "Authorization: Bearer <token>"
+ATTENDANCE_METRICS_TOKEN = config('ATTENDANCE_METRICS_TOKEN', default='')
+
+# Offer background jobs on the reports page. Only enable where run_worker runs and shares
+# MEDIA_ROOT with the web processes; otherwise exports stream from the request and
+# recalculations run in it.
+ATTENDANCE_BACKGROUND_JOBS = config('ATTENDANCE_BACKGROUND_JOBS', default=False, cast=bool)
+
+# run_worker deletes background export files this many days after the job finished
+ATTENDANCE_JOB_FILE_DAYS = config('ATTENDANCE_JOB_FILE_DAYS', default=7, cast=int)
+
+# Live updates at /events/: open streams check for changes made by other processes every
+# ATTENDANCE_EVENTS_POLL_SECONDS and close after ATTENDANCE_EVENTS_MAX_SECONDS, when the
+# browser reconnects. Without ASYNC_VIEWS each request returns at most one event.
+ATTENDANCE_EVENTS_POLL_SECONDS = config('ATTENDANCE_EVENTS_POLL_SECONDS', default=5, cast=int)
+ATTENDANCE_EVENTS_MAX_SECONDS = config('ATTENDANCE_EVENTS_MAX_SECONDS', default=300, cast=int)
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'attendance': {'handlers': ['console'], 'level': 'INFO'},
+    },
+}
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {